@@ -0,0 +1,101 @@
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.dataset import sample_queries, write_dataset
+from benchmarks.report import latency_summary, write_results
+from query import parse_query
+
+# Compares the PostgreSQL and offline search backends on the same synthetic
+# dataset. The PostgreSQL side imports into the database configured by the
+# DB_* variables, so point them at a scratch database.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def time_queries(search_in_leaks, queries):
+    timings = {}
+    for text in queries:
+        started = time.perf_counter()
+        rows = 0
+        async for batch in search_in_leaks(parse_query(text)):
+            rows += len(batch)
+        timings[text] = {"ms": (time.perf_counter() - started) * 1000, "rows": rows}
+    return timings
+
+
+def summarize(name, build_seconds, timings):
+    summary = dict(latency_summary([t["ms"] for t in timings.values()]),
+                   build_seconds=round(build_seconds, 2), queries=timings)
+    print(f"{name:>9}: kurulum {summary['build_seconds']} sn, "
+          f"p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms, max {summary['max_ms']} ms")
+    return summary
+
+
+async def bench_offline(dataset, workdir, queries):
+    import offline_index
+
+    index_dir = os.path.join(workdir, "index")
+    started = time.perf_counter()
+    offline_index.build_index(index_dir, [dataset], workers=os.cpu_count() or 1)
+    build_seconds = time.perf_counter() - started
+
+    offline_index.OFFLINE_INDEX_DIR = index_dir
+    await offline_index.open_backend()
+    try:
+        return build_seconds, await time_queries(offline_index.search_in_leaks, queries)
+    finally:
+        await offline_index.close_backend()
+
+
+async def bench_postgres(dataset, workdir, queries):
+    import db
+
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "migrate.py"], cwd=ROOT, check=True)
+    subprocess.run([sys.executable, "ingest.py", dataset, "--no-bloom",
+                    "--checkpoint", os.path.join(workdir, "checkpoint.json")], cwd=ROOT, check=True)
+    build_seconds = time.perf_counter() - started
+
+    await db.open_pool()
+    try:
+        return build_seconds, await time_queries(db.search_in_leaks, queries)
+    finally:
+        await db.close_pool()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="PostgreSQL ve çevrimdışı arama arka uçlarını karşılaştırır.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-postgres", action="store_true")
+    parser.add_argument("--output", help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    queries = sample_queries(args.queries, args.rows, args.seed)
+    results = {"rows": args.rows, "seed": args.seed}
+    with tempfile.TemporaryDirectory() as workdir:
+        dataset = os.path.join(workdir, "dataset.txt")
+        write_dataset(dataset, args.rows, args.seed)
+
+        build_seconds, timings = await bench_offline(dataset, workdir, queries)
+        results["offline"] = summarize("offline", build_seconds, timings)
+        if not args.skip_postgres:
+            build_seconds, timings = await bench_postgres(dataset, workdir, queries)
+            results["postgres"] = summarize("postgres", build_seconds, timings)
+            mismatched = [q for q in queries
+                          if results["offline"]["queries"][q]["rows"] != results["postgres"]["queries"][q]["rows"]]
+            if mismatched:
+                print(f"Uyarı: {len(mismatched)} sorguda sonuç sayıları farklı: {mismatched[:5]}")
+
+    if args.output:
+        write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+import argparse
+import json
+import sys
+
+# Compares two result files written with --output by the benchmarks and
+# exits non-zero when a metric got worse by more than the threshold, so it
+# can gate a change in CI.
+
+# Metric name endings where a higher value is better; for the others
+# (latencies, durations, memory) lower is better.
+HIGHER_IS_BETTER = ("per_second",)
+# Metric name endings compared at all; counters and settings are skipped.
+METRICS = ("_ms", "_seconds", "per_second", "_mb")
+
+
+def flatten(value, prefix=""):
+    """Yield (dotted.path, number) for every numeric leaf."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from flatten(item, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, value
+
+
+def compare(baseline: dict, current: dict, threshold: float):
+    """Return (path, old, new, change) rows and the paths that regressed."""
+    old = dict(flatten(baseline))
+    rows, regressions = [], []
+    for path, new in flatten(current):
+        if path not in old or not path.endswith(METRICS) or not old[path]:
+            continue
+        change = (new - old[path]) / old[path]
+        worse = -change if path.endswith(HIGHER_IS_BETTER) else change
+        rows.append((path, old[path], new, change))
+        if worse > threshold:
+            regressions.append(path)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="İki kıyaslama sonucunu karşılaştırır.")
+    parser.add_argument("baseline", help="Önceki sonuç (JSON)")
+    parser.add_argument("current", help="Yeni sonuç (JSON)")
+    parser.add_argument("--threshold", type=float, default=10, help="Gerileme sayılan kötüleşme (%%)")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    rows, regressions = compare(baseline, current, args.threshold / 100)
+    for path, old, new, change in rows:
+        marker = "  GERİLEME" if path in regressions else ""
+        print(f"{path:<40} {old:>12.6g} -> {new:>12.6g} ({change * 100:+.1f}%){marker}")
+    if regressions:
+        print(f"{len(regressions)} ölçümde %{args.threshold:g} üzeri gerileme.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import argparse
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from parsers import PARSERS
+
+# Deterministic synthetic leak lines for benchmarks: the same seed and
+# count always produce the same file.
+
+DOMAINS = (
+    "gmail.com", "hotmail.com", "yahoo.com", "outlook.com", "yandex.com",
+    "mail.ru", "icloud.com", "protonmail.com", "example.com.tr", "sirket.com.tr",
+)
+NAMES = (
+    "ahmet", "mehmet", "ayse", "fatma", "mustafa", "emine", "ali", "zeynep",
+    "john", "maria", "alex", "anna", "david", "elena", "murat", "elif",
+)
+# Non-ASCII usernames and passwords, so the file encoding matters.
+TURKISH_NAMES = ("şükrü", "gökçe", "çağla", "ılgaz", "özgür", "gülşen", "ömer", "eşref")
+TURKISH_CHARS = "abcçdefgğhıijklmnoöprsştuüvyz0123456789"
+# Encodings rotated over the files of a corpus; all can represent TURKISH_NAMES.
+CORPUS_ENCODINGS = ("utf-8", "cp1254", "iso-8859-9")
+# Lines written per write() call by write_dataset.
+WRITE_BATCH_LINES = 100_000
+
+
+def generate_lines(count: int, seed: int = 42):
+    """Yield ``count`` combo-list style lines."""
+    rng = random.Random(seed)
+    for i in range(count):
+        name = rng.choice(NAMES)
+        login = f"{name}{rng.randint(0, 99999)}"
+        domain = rng.choice(DOMAINS)
+        password = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz0123456789") for _ in range(rng.randint(6, 14)))
+        layout = i % 4
+        if layout == 0:
+            yield f"{login}@{domain}:{password}"
+        elif layout == 1:
+            yield f"{login};{login}@{domain};{rng.getrandbits(128):032x}"
+        elif layout == 2:
+            yield f"{login}:{password}"
+        else:
+            yield f"https://{rng.choice(DOMAINS)}/login:{login}@{domain}:{password}"
+
+
+def dirty_lines(lines, seed: int = 42):
+    """Add what real dumps contain around the records: Turkish text, null
+    bytes (from UTF-16 dumps read as bytes), padding, CRLF and blank lines.
+
+    Each input line still yields exactly one record line.
+    """
+    rng = random.Random(seed + 2)
+    for line in lines:
+        roll = rng.random()
+        if roll < 0.10:
+            name = f"{rng.choice(TURKISH_NAMES)}{rng.randint(0, 999)}"
+            secret = "".join(rng.choice(TURKISH_CHARS) for _ in range(rng.randint(6, 12)))
+            line = f"{name}:{secret}"
+        elif roll < 0.12:
+            line = "\x00".join(line)
+        elif roll < 0.15:
+            line = f"  {line}\t"
+        elif roll < 0.17:
+            line += "\r"
+        if rng.random() < 0.01:
+            yield ""
+        yield line
+
+
+def write_dataset(path: str, count: int, seed: int = 42, encoding: str = "utf-8", dirty: bool = False):
+    """Write ``count`` records; memory use does not depend on ``count``."""
+    lines = generate_lines(count, seed)
+    if dirty:
+        lines = dirty_lines(lines, seed)
+    with open(path, "w", encoding=encoding, errors="replace", newline="\n") as f:
+        while True:
+            batch = list(islice(lines, WRITE_BATCH_LINES))
+            if not batch:
+                break
+            f.write("\n".join(batch) + "\n")
+
+
+def _write_file(task):
+    write_dataset(*task)
+
+
+def write_corpus(directory: str, count: int, files: int = 3, seed: int = 42, dirty: bool = True,
+                 workers: int = 1, reuse: bool = False):
+    """Split ``count`` records over ``files`` dump files in rotating encodings.
+
+    File ``i`` uses seed ``seed + i``, so files can be written in parallel
+    by ``workers`` processes with the same result. With ``reuse``, files
+    that already exist are kept. Returns the paths.
+    """
+    os.makedirs(directory, exist_ok=True)
+    tasks = []
+    for i in range(files):
+        encoding = CORPUS_ENCODINGS[i % len(CORPUS_ENCODINGS)]
+        path = os.path.join(directory, f"dump{i:03d}_{encoding}.txt")
+        rows = count // files + (1 if i < count % files else 0)
+        tasks.append((path, rows, seed + i, encoding, dirty))
+    missing = [task for task in tasks if not (reuse and os.path.exists(task[0]))]
+    with ProcessPoolExecutor(workers) as executor:
+        list(executor.map(_write_file, missing))
+    return [task[0] for task in tasks]
+
+
+def sample_queries(count: int, rows: int, seed: int = 42):
+    """Search inputs drawn from the generated lines, mixing hits of
+    different breadth with misses."""
+    lines = list(islice(generate_lines(rows, seed), min(rows, 100_000)))
+    rng = random.Random(seed + 1)
+    queries = []
+    for i in range(count):
+        parsed = PARSERS["auto"](rng.choice(lines))
+        kind = i % 5
+        if kind == 0 and parsed.username:
+            queries.append(parsed.username)
+        elif kind == 1 and parsed.email_domain:
+            queries.append(f"domain:{parsed.email_domain}")
+        elif kind == 2 and parsed.email:
+            queries.append(f"email:{parsed.email}")
+        elif kind == 3 and parsed.email_local:
+            # A shorter prefix of a real login matches many lines.
+            queries.append(parsed.email_local[:len(parsed.email_local) - 3])
+        else:
+            queries.append("".join(rng.choice("qxzvjk") for _ in range(8)))
+    return queries
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sentetik sızıntı dökümleri üretir.")
+    parser.add_argument("directory", help="Dosyaların yazılacağı klasör")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Toplam kayıt sayısı (100M'a kadar)")
+    parser.add_argument("--files", type=int, default=3, help="Dosya sayısı; kodlamalar dosyalar arasında değişir")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--clean", action="store_true", help="Null bayt, boş satır ve Türkçe karakter ekleme")
+    args = parser.parse_args()
+    for path in write_corpus(args.directory, args.rows, args.files, args.seed, not args.clean, args.workers):
+        print(path)
@@ -0,0 +1,91 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.dataset import write_corpus
+from benchmarks.report import write_results
+
+# Times the import path on a generated corpus in mixed encodings: ingest.py
+# into PostgreSQL (the database configured by DB_*, so use a scratch one) or
+# an offline_index.py build. Each run imports into its own source, which is
+# dropped afterwards unless --keep is given.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_measured(cmd):
+    """Run ``cmd`` and return (seconds, peak RSS in MB of its largest process).
+
+    os.wait4 reports the child together with the worker processes it has
+    reaped, so the pool workers of ingest.py are included. Linux reports
+    ru_maxrss in kilobytes.
+    """
+    started = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=ROOT)
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    elapsed = time.perf_counter() - started
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+    return elapsed, usage.ru_maxrss / 1024
+
+
+def ingest_command(args, paths, workdir, source):
+    if args.backend == "offline":
+        return [sys.executable, "offline_index.py", "--index-dir", os.path.join(workdir, "index"),
+                "build", *paths, "--workers", str(args.workers), "--source", source]
+    cmd = [sys.executable, "ingest.py", *paths, "--workers", str(args.workers), "--source", source,
+           "--checkpoint", os.path.join(workdir, "checkpoint.json"), "--bloom", os.path.join(workdir, "bench.bloom")]
+    return cmd + ["--no-bloom"] if args.no_bloom else cmd
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aktarma hızını (satır/sn) ve en yüksek bellek kullanımını ölçer.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--files", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--backend", choices=("postgres", "offline"), default="postgres")
+    parser.add_argument("--no-bloom", action="store_true", help="ingest.py'yi Bloom filtresi olmadan çalıştır")
+    parser.add_argument("--dataset-dir", help="Üretilen dosyaları burada tut; sonraki çalıştırmalar mevcut dosyaları yeniden kullanır")
+    parser.add_argument("--keep", action="store_true", help="Aktarılan kaynağı sonradan silme")
+    parser.add_argument("--output", help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    source = f"bench-{args.seed}-{args.rows}"
+    results = {"backend": args.backend, "rows": args.rows, "files": args.files, "seed": args.seed,
+               "workers": args.workers, "bloom": not args.no_bloom}
+    with tempfile.TemporaryDirectory() as workdir:
+        dataset_dir = args.dataset_dir or os.path.join(workdir, "dataset")
+        started = time.perf_counter()
+        paths = write_corpus(dataset_dir, args.rows, args.files, args.seed, workers=args.workers,
+                             reuse=bool(args.dataset_dir))
+        results["generate_seconds"] = round(time.perf_counter() - started, 2)
+        size_mb = sum(os.path.getsize(path) for path in paths) / 1024 / 1024
+
+        if args.backend == "postgres":
+            subprocess.run([sys.executable, "migrate.py"], cwd=ROOT, check=True)
+        try:
+            seconds, peak_rss_mb = run_measured(ingest_command(args, paths, workdir, source))
+        finally:
+            if args.backend == "postgres" and not args.keep:
+                subprocess.run([sys.executable, "delete_all_data.py", "--source", source], cwd=ROOT)
+
+    results.update(
+        ingest_seconds=round(seconds, 2),
+        rows_per_second=round(args.rows / seconds),
+        mb_per_second=round(size_mb / seconds, 2),
+        input_mb=round(size_mb, 1),
+        peak_rss_mb=round(peak_rss_mb, 1),
+    )
+    print(f"{args.backend}: {results['rows_per_second']:,} satır/sn, {results['mb_per_second']} MB/sn, "
+          f"en yüksek RSS {results['peak_rss_mb']} MB")
+    if args.output:
+        write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import argparse
+import asyncio
+import os
+import random
+import time
+
+# bot.py refuses to start without a token; no request ever reaches Telegram.
+os.environ.setdefault("TOKEN", "benchmark")
+
+import bot  # noqa: E402
+import export  # noqa: E402
+import storage  # noqa: E402
+from config import SEARCH_BACKEND  # noqa: E402
+from benchmarks.dataset import sample_queries  # noqa: E402
+from benchmarks.report import latency_summary, write_results  # noqa: E402
+from jobs import search_jobs  # noqa: E402
+
+# Drives the bot's handlers directly with fake Update/Context objects, so
+# the whole path (authorization, job queue, search, export) is measured
+# without Telegram. Run it against the backend selected by SEARCH_BACKEND
+# after loading a dataset with the same --rows/--seed, e.g. with
+# benchmarks.backends or benchmarks.ingest_rate --keep. The synthetic users
+# are added to bot_users, so use a scratch database.
+
+# Far from real Telegram ids.
+FIRST_CHAT_ID = 9_000_000_000
+# Replies that acknowledge a queued job rather than finish the request.
+QUEUED_REPLY = "sıraya alındı"
+ERROR_REPLY = "Bir hata oluştu"
+
+
+class FakeUser:
+    def __init__(self, chat_id):
+        self.id = chat_id
+
+
+class FakeMessage:
+    """Records replies; ``done`` is set by the reply that completes the request."""
+
+    def __init__(self):
+        self.replies = []
+        self.done = asyncio.Event()
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+        if QUEUED_REPLY not in text:
+            self.done.set()
+
+    async def reply_document(self, document, filename=None, caption=None, **kwargs):
+        self.replies.append(f"<{filename}: {len(document)} bayt>")
+        self.done.set()
+
+
+class FakeUpdate:
+    def __init__(self, chat_id):
+        self.effective_user = FakeUser(chat_id)
+        self.message = FakeMessage()
+
+
+class FakeContext:
+    def __init__(self, args):
+        self.args = args
+
+
+async def request(command, chat_id, args, timeout):
+    """Run one handler call; returns (milliseconds, completed)."""
+    update = FakeUpdate(chat_id)
+    handler = bot.search_command if command == "search" else bot.authorize_command
+    started = time.perf_counter()
+    await handler(update, FakeContext(args))
+    try:
+        await asyncio.wait_for(update.message.done.wait(), timeout)
+    except asyncio.TimeoutError:
+        return (time.perf_counter() - started) * 1000, False
+    replies = update.message.replies
+    # A search refused by the job queue is never acknowledged as queued.
+    completed = (command != "search" or any(QUEUED_REPLY in reply for reply in replies)) \
+        and not any(ERROR_REPLY in reply for reply in replies)
+    return (time.perf_counter() - started) * 1000, completed
+
+
+async def virtual_user(chat_id, queries, args, rng, latencies, outcomes):
+    for _ in range(args.requests):
+        if rng.random() < args.authorize_ratio:
+            command, command_args = "authorize", [str(chat_id)]
+        else:
+            command, command_args = "search", rng.choice(queries).split()
+        ms, completed = await request(command, chat_id, command_args, args.timeout)
+        latencies[command].append(ms)
+        outcomes[command]["completed" if completed else "failed"] += 1
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Bot komutlarını sahte güncellemelerle yük altında çalıştırır.")
+    parser.add_argument("--users", type=int, default=20, help="Eş zamanlı sanal kullanıcı sayısı")
+    parser.add_argument("--requests", type=int, default=20, help="Kullanıcı başına istek sayısı")
+    parser.add_argument("--authorize-ratio", type=float, default=0.2, help="İsteklerin /authorize oranı")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Yüklenen veri setinin satır sayısı")
+    parser.add_argument("--seed", type=int, default=42, help="Yüklenen veri setinin tohumu")
+    parser.add_argument("--queries", type=int, default=200, help="Farklı arama sayısı")
+    parser.add_argument("--timeout", type=float, default=600, help="İstek başına en fazla bekleme (sn)")
+    parser.add_argument("--no-result-cache", action="store_true", help="Sonuç önbelleğini kapat")
+    parser.add_argument("--respect-limits", action="store_true",
+                        help="Kullanıcı başına hız ve eş zamanlılık sınırlarını uygula")
+    parser.add_argument("--output", help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    if args.no_result_cache:
+        export.result_cache.max_bytes = 0
+    if not args.respect_limits:
+        search_jobs.rate_limit = args.requests + 1
+
+    await bot.on_startup(None)
+    try:
+        chat_ids = [FIRST_CHAT_ID + i for i in range(args.users)]
+        for chat_id in chat_ids:
+            await storage.ensure_user_in_db(chat_id)
+            await storage.authorize_user(chat_id)
+
+        queries = sample_queries(args.queries, args.rows, args.seed)
+        latencies = {"search": [], "authorize": []}
+        outcomes = {command: {"completed": 0, "failed": 0} for command in latencies}
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            virtual_user(chat_id, queries, args, random.Random(args.seed + chat_id), latencies, outcomes)
+            for chat_id in chat_ids
+        ))
+        elapsed = time.perf_counter() - started
+    finally:
+        await bot.on_shutdown(None)
+
+    results = {
+        "backend": SEARCH_BACKEND,
+        "users": args.users,
+        "requests_per_user": args.requests,
+        "rows": args.rows,
+        "seed": args.seed,
+        "seconds": round(elapsed, 2),
+        "requests_per_second": round(sum(len(v) for v in latencies.values()) / elapsed, 2),
+    }
+    for command, values in latencies.items():
+        results[command] = dict(latency_summary(values), **outcomes[command])
+        summary = results[command]
+        if values:
+            print(f"{command:>9}: {summary['count']} istek, p50 {summary['p50_ms']} ms, "
+                  f"p95 {summary['p95_ms']} ms, p99 {summary['p99_ms']} ms, hatalı {summary['failed']}")
+    print(f"Toplam: {results['requests_per_second']} istek/sn")
+    results["result_cache"] = export.cache_stats()
+    results["queue"] = search_jobs.stats()
+    if args.output:
+        write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
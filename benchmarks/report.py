@@ -0,0 +1,25 @@
+import json
+
+
+def percentile(sorted_values, fraction: float):
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def latency_summary(latencies_ms) -> dict:
+    """p50/p95/p99/max of a list of millisecond latencies, rounded for JSON."""
+    values = sorted(latencies_ms)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 0.50), 2),
+        "p95_ms": round(percentile(values, 0.95), 2),
+        "p99_ms": round(percentile(values, 0.99), 2),
+        "max_ms": round(values[-1], 2),
+    }
+
+
+def write_results(path, results: dict):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
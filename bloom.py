@@ -0,0 +1,79 @@
+import math
+import mmap
+import os
+import struct
+
+# On-disk layout: header, then the bit array. The file is memory-mapped, so
+# ingest workers share the writer's pages instead of each loading a copy.
+MAGIC = b"LLBLOOM1"
+HEADER = struct.Struct("<8sQI")  # magic, bit count, hash count
+
+
+class BloomFilter:
+    """Memory-mapped Bloom filter over 16-byte content hashes.
+
+    Items are already uniformly distributed digests, so the probe positions
+    are derived from the digest itself by double hashing.
+    """
+
+    def __init__(self, path: str, writable: bool = False):
+        self.path = path
+        mode = "r+b" if writable else "rb"
+        with open(path, mode) as f:
+            access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+            self._mm = mmap.mmap(f.fileno(), 0, access=access)
+        magic, self.bits, self.hashes = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} bir Bloom filtresi dosyası değil.")
+        self._offset = HEADER.size
+
+    @classmethod
+    def create(cls, path: str, capacity: int, error_rate: float) -> "BloomFilter":
+        """Create an empty filter sized for ``capacity`` items at ``error_rate``."""
+        bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        bits = (bits + 7) // 8 * 8
+        hashes = max(1, round(bits / capacity * math.log(2)))
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, bits, hashes))
+            f.truncate(HEADER.size + bits // 8)
+        return cls(path, writable=True)
+
+    @classmethod
+    def open_or_create(cls, path: str, capacity: int, error_rate: float) -> "BloomFilter":
+        if os.path.exists(path):
+            return cls(path, writable=True)
+        return cls.create(path, capacity, error_rate)
+
+    @property
+    def capacity(self) -> int:
+        """Item count the filter was sized for (the inverse of create())."""
+        return int(self.bits * math.log(2) / self.hashes)
+
+    def false_positive_rate(self, items: int) -> float:
+        """Expected false-positive rate once ``items`` items have been added."""
+        return (1 - math.exp(-self.hashes * items / self.bits)) ** self.hashes
+
+    def _positions(self, digest: bytes):
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:16], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.bits
+
+    def add(self, digest: bytes):
+        mm, offset = self._mm, self._offset
+        for pos in self._positions(digest):
+            index = offset + (pos >> 3)
+            mm[index] = mm[index] | (1 << (pos & 7))
+
+    def __contains__(self, digest: bytes) -> bool:
+        mm, offset = self._mm, self._offset
+        for pos in self._positions(digest):
+            if not mm[offset + (pos >> 3)] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def flush(self):
+        self._mm.flush()
+
+    def close(self):
+        self._mm.close()
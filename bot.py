@@ -1,8 +1,17 @@
-import os
+import asyncio
 import logging
-import psycopg2
+import tempfile
+import time
 from telegram import Update
-from telegram.ext import ApplicationBuilder, CommandHandler, ContextTypes
+from telegram.ext import ApplicationBuilder, CommandHandler, ContextTypes, MessageHandler, filters
+
+import storage
+from config import TOKEN, MIN_KEYWORD_LENGTH, SEARCH_BACKEND, BULK_MAX_FILE_BYTES, require_db_config
+import bulk
+import export
+import metrics
+from jobs import JobRejected, search_jobs
+from query import SearchQuery, parse_query
 
 # Logging configuration
 logging.basicConfig(
@@ -10,130 +19,19 @@ logging.basicConfig(
     level=logging.INFO
 )
 
-# Fetch environment variables directly
-DB_NAME = os.getenv("DB_NAME")
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT")
-TOKEN = os.getenv("TOKEN")
-
 # Validate critical environment variables
 if not TOKEN:
     raise EnvironmentError("TOKEN çevresel değişkeni eksik.")
-if not DB_NAME or not DB_USER or not DB_PASSWORD or not DB_HOST or not DB_PORT:
-    raise EnvironmentError("Veritabanı yapılandırması eksik. Çevresel değişkenleri kontrol edin.")
-
-# --------------------------------------------------------------
-# Database Functions
-# --------------------------------------------------------------
-def ensure_user_in_db(chat_id: int):
-    """Ensure the user exists in bot_users table."""
-    try:
-        conn = psycopg2.connect(
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT
-        )
-        cur = conn.cursor()
-        cur.execute("SELECT chat_id FROM bot_users WHERE chat_id = %s", (chat_id,))
-        row = cur.fetchone()
-        if not row:
-            cur.execute("INSERT INTO bot_users (chat_id, is_authorized, is_admin) VALUES (%s, FALSE, FALSE)", (chat_id,))
-            conn.commit()
-    except Exception as e:
-        logging.error(f"ensure_user_in_db hatası: {e}")
-    finally:
-        if 'cur' in locals():
-            cur.close()
-        if 'conn' in locals():
-            conn.close()
-
-def is_user_authorized(chat_id: int) -> bool:
-    """Check if the user is authorized (normal admin)."""
-    authorized = False
-    try:
-        conn = psycopg2.connect(
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT
-        )
-        cur = conn.cursor()
-        cur.execute("SELECT is_authorized FROM bot_users WHERE chat_id = %s", (chat_id,))
-        row = cur.fetchone()
-        if row:
-            authorized = row[0]
-    except Exception as e:
-        logging.error(f"is_user_authorized hatası: {e}")
-    finally:
-        if 'cur' in locals():
-            cur.close()
-        if 'conn' in locals():
-            conn.close()
-    return authorized
-
-def is_user_super_admin(chat_id: int) -> bool:
-    """Check if the user is a super admin."""
-    is_admin = False
-    try:
-        conn = psycopg2.connect(
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT
-        )
-        cur = conn.cursor()
-        cur.execute("SELECT is_admin FROM bot_users WHERE chat_id = %s", (chat_id,))
-        row = cur.fetchone()
-        if row:
-            is_admin = row[0]
-    except Exception as e:
-        logging.error(f"is_user_super_admin hatası: {e}")
-    finally:
-        if 'cur' in locals():
-            cur.close()
-        if 'conn' in locals():
-            conn.close()
-    return is_admin
-
-def search_in_leaks(keyword: str):
-    """Search for the keyword in the leaks table."""
-    results = []
-    try:
-        conn = psycopg2.connect(
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT
-        )
-        cur = conn.cursor()
-        query = "SELECT data FROM leaks WHERE data ILIKE %s"
-        like_pattern = f"%{keyword}%"
-        cur.execute(query, (like_pattern,))
-        rows = cur.fetchall()
-        results = [row[0] for row in rows]
-    except Exception as e:
-        logging.error(f"search_in_leaks hatası: {e}")
-        results = None  # Indicate an error occurred
-    finally:
-        if 'cur' in locals():
-            cur.close()
-        if 'conn' in locals():
-            conn.close()
-    return results
+if SEARCH_BACKEND == "postgres":
+    require_db_config()
 
 # --------------------------------------------------------------
 # Bot Command Functions (ASYNC)
 # --------------------------------------------------------------
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_user.id
-    ensure_user_in_db(chat_id)
+    if await storage.get_user(chat_id) is None:
+        await storage.ensure_user_in_db(chat_id)
     text = (
         "Merhaba! Yerli ve Milli Sızıntı Asistanı'na hoş geldiniz.\n"
         "Komutlar için /help yazabilirsiniz."
@@ -147,6 +45,12 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "/help - Yardım\n"
         "/authorize <chat_id> - Yetkilendirme işlemi\n"
         "/search <anahtar kelime> - Sızıntı araması yap\n"
+        "/search email:<adres> | domain:<alan adı> | username:<ad> - Tam eşleşmeli hızlı arama\n"
+        "/search source:<kaynak> ... - Aramayı bir dökümle sınırla\n"
+        "/sources - Aranabilir kaynakları listele\n"
+        "/bulk - Dosyadaki e-posta/alan adı listesini tek seferde ara (dosyayı /bulk açıklamasıyla gönderin)\n"
+        "/cancel - Süren veya sıradaki aramanızı iptal et\n"
+        "/stats - Önbellek istatistikleri (süper admin)\n"
     )
     await update.message.reply_text(text)
 
@@ -161,53 +65,24 @@ async def authorize_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         target_chat_id = int(context.args[0])
 
+        requester = await storage.get_user(requester_chat_id)
+
         if requester_chat_id == target_chat_id:
-            conn = psycopg2.connect(
-                dbname=DB_NAME,
-                user=DB_USER,
-                password=DB_PASSWORD,
-                host=DB_HOST,
-                port=DB_PORT
-            )
-            cur = conn.cursor()
-            cur.execute("SELECT is_authorized FROM bot_users WHERE chat_id = %s", (requester_chat_id,))
-            row = cur.fetchone()
-
-            if row:
-                if row[0]:
-                    await update.message.reply_text("Zaten yetkilisiniz.")
-                else:
-                    cur.execute("UPDATE bot_users SET is_authorized = TRUE WHERE chat_id = %s", (requester_chat_id,))
-                    conn.commit()
-                    await update.message.reply_text("Başarıyla yetkilendirildiniz.")
+            if requester and requester.is_authorized:
+                await update.message.reply_text("Zaten yetkilisiniz.")
+            elif await storage.authorize_user(requester_chat_id):
+                await update.message.reply_text("Başarıyla yetkilendirildiniz.")
             else:
                 await update.message.reply_text("Chat ID'niz veritabanında bulunamadı. Lütfen bir süper adminle iletişime geçin.")
-            cur.close()
-            conn.close()
         else:
-            if not is_user_super_admin(requester_chat_id):
+            if not (requester and requester.is_admin):
                 await update.message.reply_text("Başkalarını yetkilendirme izniniz yok.")
                 return
 
-            conn = psycopg2.connect(
-                dbname=DB_NAME,
-                user=DB_USER,
-                password=DB_PASSWORD,
-                host=DB_HOST,
-                port=DB_PORT
-            )
-            cur = conn.cursor()
-            cur.execute("SELECT chat_id FROM bot_users WHERE chat_id = %s", (target_chat_id,))
-            row = cur.fetchone()
-
-            if row:
-                cur.execute("UPDATE bot_users SET is_authorized = TRUE WHERE chat_id = %s", (target_chat_id,))
-                conn.commit()
+            if await storage.authorize_user(target_chat_id):
                 await update.message.reply_text(f"Kullanıcı {target_chat_id} başarıyla yetkilendirildi.")
             else:
                 await update.message.reply_text(f"Chat ID {target_chat_id} veritabanında bulunamadı.")
-            cur.close()
-            conn.close()
 
     except ValueError:
         await update.message.reply_text("Geçerli bir sayısal chat_id giriniz.")
@@ -219,7 +94,8 @@ async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Allow authorized users and super admins to perform searches."""
     chat_id = update.effective_user.id
 
-    if not is_user_authorized(chat_id) and not is_user_super_admin(chat_id):
+    user = await storage.get_user(chat_id)
+    if not user or not (user.is_authorized or user.is_admin):
         await update.message.reply_text("Arama yapabilmek için yetkili değilsiniz.")
         return
 
@@ -227,39 +103,233 @@ async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Lütfen bir anahtar kelime girin. Örnek: /search [anahtar kelime]")
         return
 
-    keyword = " ".join(context.args)
-    data_list = search_in_leaks(keyword)
-    if data_list is None:
+    query = parse_query(" ".join(context.args))
+    if query.mode == "text" and len(query.value) < MIN_KEYWORD_LENGTH:
+        await update.message.reply_text(f"Anahtar kelime en az {MIN_KEYWORD_LENGTH} karakter olmalıdır.")
+        return
+
+    try:
+        position = search_jobs.submit(chat_id, lambda: run_search(update, query), update.message.reply_text)
+    except JobRejected as e:
+        await update.message.reply_text(str(e))
+        return
+    await update.message.reply_text(f"Aramanız sıraya alındı (sıra: {position}). İptal için /cancel")
+
+async def run_search(update: Update, query: SearchQuery):
+    """Run a queued search and send the result; called by a search_jobs worker."""
+    started = time.perf_counter()
+    try:
+        if query.sources:
+            known = {source.name for source in await storage.list_sources()}
+            unknown = [name for name in query.sources if name not in known]
+            if unknown:
+                await update.message.reply_text(f"Bilinmeyen kaynak: {', '.join(unknown)}. Liste için /sources")
+                return
+        generation = await storage.get_data_generation()
+        result = await export.search_results(query, storage.search_in_leaks, generation)
+    except Exception as e:
+        logging.error(f"search_in_leaks hatası: {e}")
         await update.message.reply_text("Bir hata oluştu. Lütfen daha sonra tekrar deneyin.")
         return
-    if len(data_list) == 0:
-        await update.message.reply_text("Sonuç bulunamadı.")
+
+    notes = []
+    if result.skipped:
+        notes.append(f"Zaman aşımı nedeniyle eksik kalan kaynaklar: {', '.join(result.skipped)}.")
+    if result.rows == 0:
+        await update.message.reply_text("\n".join(["Sonuç bulunamadı."] + notes))
+        return
+
+    if result.truncated:
+        notes.append(f"Sonuçlar kısaltıldı: yalnızca ilk {result.rows} satır gönderildi.")
+    caption = "\n".join(notes) or None
+    upload_started = time.perf_counter()
+    await update.message.reply_document(document=result.payload, filename=result.filename, caption=caption)
+    upload_seconds = time.perf_counter() - upload_started
+    metrics.observe_result(query.mode, result.rows, len(result.payload), upload_seconds)
+    logging.info(
+        f"Arama ({query.mode}): {result.rows} satır, {len(result.payload)} bayt, "
+        f"toplam {time.perf_counter() - started:.2f} sn, yükleme {upload_seconds:.2f} sn"
+    )
+
+async def bulk_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Explain how to start a bulk lookup; the file itself arrives as a document."""
+    await update.message.reply_text(
+        "Her satırda bir anahtar kelime olan bir metin dosyası gönderin ve açıklamasına /bulk yazın.\n"
+        "E-posta adresleri ve alan adları (ör. ornek.com, @ornek.local) tam eşleşmeyle, diğer satırlar "
+        "(ör. ahmet.yilmaz) metin olarak aranır; email:/domain:/username: önekleri de kullanılabilir."
+    )
+
+async def bulk_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Queue a bulk lookup for a document sent with a /bulk caption."""
+    chat_id = update.effective_user.id
+
+    user = await storage.get_user(chat_id)
+    if not user or not (user.is_authorized or user.is_admin):
+        await update.message.reply_text("Arama yapabilmek için yetkili değilsiniz.")
+        return
+
+    document = update.message.document
+    if document.file_size and document.file_size > BULK_MAX_FILE_BYTES:
+        await update.message.reply_text(f"Dosya en fazla {BULK_MAX_FILE_BYTES // 1024 // 1024} MB olabilir.")
+        return
+
+    try:
+        position = search_jobs.submit(chat_id, lambda: run_bulk(update), update.message.reply_text)
+    except JobRejected as e:
+        await update.message.reply_text(str(e))
         return
+    await update.message.reply_text(f"Toplu aramanız sıraya alındı (sıra: {position}). İptal için /cancel")
+
+async def run_bulk(update: Update):
+    """Download the keyword file, look every keyword up and send one result file."""
+    started = time.perf_counter()
+    try:
+        with tempfile.TemporaryFile() as upload:
+            telegram_file = await update.message.document.get_file()
+            await telegram_file.download_to_memory(upload)
+            upload.seek(0)
+            keywords = await asyncio.to_thread(bulk.read_keywords, upload)
+        if not keywords.queries:
+            await update.message.reply_text("Dosyada aranabilecek bir anahtar kelime bulunamadı.")
+            return
+
+        stats = bulk.BulkStats(len(keywords.queries))
+        result = await export.export_results("toplu_arama", bulk.bulk_lines(keywords.queries, storage.bulk_search, stats))
+        with result.file:
+            payload = await asyncio.to_thread(result.file.read)
+    except Exception as e:
+        logging.error(f"bulk_search hatası: {e}")
+        await update.message.reply_text("Bir hata oluştu. Lütfen daha sonra tekrar deneyin.")
+        return
+
+    notes = [f"{stats.keywords} anahtar kelime, {stats.matched} eşleşen, {stats.rows} satır."]
+    skipped = []
+    if keywords.duplicates:
+        skipped.append(f"{keywords.duplicates} tekrar")
+    if keywords.invalid:
+        skipped.append(f"{keywords.invalid} geçersiz")
+    if keywords.dropped:
+        skipped.append(f"sınırı aşan {keywords.dropped}")
+    if skipped:
+        notes.append(f"Atlanan satırlar: {', '.join(skipped)}.")
+    if stats.unfinished:
+        notes.append(f"Zaman bütçesi aşıldı: {stats.unfinished} anahtar kelime aranamadı.")
+    if result.truncated:
+        notes.append("Sonuç dosyası boyut sınırında kısaltıldı.")
+    upload_started = time.perf_counter()
+    await update.message.reply_document(document=payload, filename=result.filename, caption="\n".join(notes))
+    upload_seconds = time.perf_counter() - upload_started
+    metrics.observe_result(None, stats.rows, len(payload), upload_seconds)
+    logging.info(
+        f"Toplu arama: {stats.keywords} anahtar kelime, {stats.rows} satır, {len(payload)} bayt, "
+        f"toplam {time.perf_counter() - started:.2f} sn, yükleme {upload_seconds:.2f} sn"
+    )
 
-    output_file = f"{keyword.replace(' ', '_')}.txt"
-    with open(output_file, "w", encoding="utf-8") as f:
-        for line in data_list:
-            f.write(line + "\n")
+async def cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Cancel the user's queued and running searches."""
+    if search_jobs.cancel(update.effective_user.id):
+        await update.message.reply_text("Aramanız iptal edildi.")
+    else:
+        await update.message.reply_text("İptal edilecek bir aramanız yok.")
+
+async def sources_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """List the dumps that can be named in a source: filter."""
+    user = await storage.get_user(update.effective_user.id)
+    if not user or not (user.is_authorized or user.is_admin):
+        await update.message.reply_text("Kaynakları görmek için yetkili değilsiniz.")
+        return
 
     try:
-        await update.message.reply_document(document=open(output_file, "rb"))
-    finally:
-        try:
-            os.remove(output_file)
-        except Exception as e:
-            logging.error(f"Dosya silme hatası: {e}")
+        sources = await storage.list_sources()
+    except Exception as e:
+        logging.error(f"list_sources hatası: {e}")
+        await update.message.reply_text("Bir hata oluştu. Lütfen daha sonra tekrar deneyin.")
+        return
+
+    if not sources:
+        await update.message.reply_text("Henüz aktarılmış kaynak yok.")
+        return
+    lines = ["Kaynaklar:"]
+    for source in sources:
+        imported = f", {source.imported_at:%Y-%m-%d}" if source.imported_at else ""
+        lines.append(f"{source.name} - {source.row_count} satır ({source.format}{imported})")
+    await update.message.reply_text("\n".join(lines))
+
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show internal counters to super admins."""
+    user = await storage.get_user(update.effective_user.id)
+    if not user or not user.is_admin:
+        await update.message.reply_text("Bu komut yalnızca süper adminler içindir.")
+        return
+
+    text = ""
+    cache = storage.cache_stats()
+    if cache is not None:
+        text += (
+            "Yetki önbelleği:\n"
+            f"Kayıt: {cache['size']}\n"
+            f"İsabet: {cache['hits']}\n"
+            f"Iskalama: {cache['misses']}\n\n"
+        )
+    results = export.cache_stats()
+    text += (
+        "Sonuç önbelleği:\n"
+        f"Kayıt: {results['size']} ({results['bytes'] / 1024 / 1024:.1f} MB)\n"
+        f"İsabet: {results['hits']}\n"
+        f"Iskalama: {results['misses']}\n"
+        f"Birleştirilen eş zamanlı arama: {results['coalesced']}\n"
+        f"Süren arama: {results['in_flight']}\n\n"
+    )
+    queue = search_jobs.stats()
+    text += (
+        "Arama kuyruğu:\n"
+        f"Sırada: {queue['queued']}\n"
+        f"Çalışan: {queue['running']}\n"
+        f"Biten: {queue['completed']}\n"
+        f"Hatalı: {queue['failed']}\n"
+        f"İptal edilen: {queue['cancelled']}\n"
+        f"Zaman aşımı: {queue['timed_out']}\n"
+        f"Reddedilen: {queue['rejected']}\n"
+    )
+    await update.message.reply_text(text)
 
 # --------------------------------------------------------------
 # Main Application
 # --------------------------------------------------------------
+async def on_startup(app):
+    await storage.open_backend()
+    search_jobs.start()
+    metrics.start_metrics_server()
+
+async def on_shutdown(app):
+    metrics.stop_metrics_server()
+    await search_jobs.stop()
+    await storage.close_backend()
+
 def main():
-    app = ApplicationBuilder().token(TOKEN).build()
+    app = (
+        ApplicationBuilder()
+        .token(TOKEN)
+        # Handle updates concurrently so /start, /help and /cancel are not
+        # stuck behind another user's slow handler.
+        .concurrent_updates(True)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+        .build()
+    )
 
     # Register commands
-    app.add_handler(CommandHandler("start", start_command))
-    app.add_handler(CommandHandler("help", help_command))
-    app.add_handler(CommandHandler("authorize", authorize_command))
-    app.add_handler(CommandHandler("search", search_command))
+    app.add_handler(CommandHandler("start", metrics.instrument_handler("start", start_command)))
+    app.add_handler(CommandHandler("help", metrics.instrument_handler("help", help_command)))
+    app.add_handler(CommandHandler("authorize", metrics.instrument_handler("authorize", authorize_command)))
+    app.add_handler(CommandHandler("search", metrics.instrument_handler("search", search_command)))
+    app.add_handler(CommandHandler("sources", metrics.instrument_handler("sources", sources_command)))
+    app.add_handler(CommandHandler("cancel", metrics.instrument_handler("cancel", cancel_command)))
+    app.add_handler(CommandHandler("bulk", metrics.instrument_handler("bulk", bulk_command)))
+    # Commands in a document caption never reach CommandHandler.
+    app.add_handler(MessageHandler(filters.Document.ALL & filters.CaptionRegex(r"^/bulk\b"),
+                                   metrics.instrument_handler("bulk_document", bulk_document)))
+    app.add_handler(CommandHandler("stats", metrics.instrument_handler("stats", stats_command)))
 
     print("Bot çalışıyor...")
     app.run_polling()
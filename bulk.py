@@ -0,0 +1,138 @@
+import asyncio
+import io
+import re
+from typing import List, NamedTuple, Optional
+
+from config import (
+    MIN_KEYWORD_LENGTH, BULK_MAX_KEYWORDS, BULK_CHUNK_SIZE, BULK_ROWS_PER_KEYWORD, BULK_TIME_BUDGET,
+)
+from parsers import is_email
+from query import SearchQuery, parse_query
+
+# /bulk: one keyword per line of an uploaded document, answered with one
+# set-based query per chunk of same-mode keywords instead of a search each.
+
+DOMAIN_RE = re.compile(r"^[a-z0-9-]+(\.[a-z0-9-]+)*\.([a-z0-9-]+)$")
+# A bare dotted keyword is only a domain when its last label is a two-letter
+# country code or one of these generic TLDs, so names like john.doe stay
+# substring searches. "@example.xyz" or domain: forces an exact lookup.
+GENERIC_TLDS = frozenset((
+    "com", "net", "org", "edu", "gov", "mil", "int", "info", "biz", "name", "pro", "mobi",
+    "app", "dev", "xyz", "online", "site", "shop", "store", "tech", "club", "live", "email",
+))
+
+
+class BulkInput(NamedTuple):
+    queries: List[SearchQuery]  # unique keywords, in input order
+    duplicates: int
+    invalid: int
+    dropped: int  # keywords beyond BULK_MAX_KEYWORDS
+
+
+class BulkStats:
+    def __init__(self, keywords: int):
+        self.keywords = keywords
+        self.matched = 0
+        self.rows = 0
+        self.unfinished = 0  # keywords not looked up before the time budget ran out
+
+
+def looks_like_domain(value: str) -> bool:
+    """True for a bare keyword such as ``example.com`` or ``@example.local``."""
+    match = DOMAIN_RE.match(value.lstrip("@"))
+    if not match:
+        return False
+    tld = match.group(2)
+    return value.startswith("@") or (tld.isalpha() and (len(tld) == 2 or tld in GENERIC_TLDS))
+
+
+def parse_bulk_keyword(line: str) -> Optional[SearchQuery]:
+    """Like /search, except that bare emails and domains become exact lookups."""
+    query = parse_query(line)
+    if query.mode == "text":
+        value = query.value
+        if is_email(value):
+            return SearchQuery("email", value)
+        if looks_like_domain(value):
+            return SearchQuery("domain", value.lstrip("@"))
+        if len(value) < MIN_KEYWORD_LENGTH:
+            return None
+    # Per-line source: filters are not supported; the whole file is searched.
+    return SearchQuery(query.mode, query.value)
+
+
+def read_keywords(file: io.BufferedIOBase, max_keywords: int = BULK_MAX_KEYWORDS) -> BulkInput:
+    """Stream keywords from an uploaded file, dropping duplicates and invalid lines."""
+    seen = set()
+    queries = []
+    duplicates = invalid = dropped = 0
+    for line in io.TextIOWrapper(file, encoding="utf-8", errors="replace"):
+        line = line.replace("\x00", "").strip()
+        if not line:
+            continue
+        query = parse_bulk_keyword(line)
+        if query is None:
+            invalid += 1
+        elif query in seen:
+            duplicates += 1
+        elif len(queries) >= max_keywords:
+            dropped += 1
+        else:
+            seen.add(query)
+            queries.append(query)
+    return BulkInput(queries, duplicates, invalid, dropped)
+
+
+def keyword_label(query: SearchQuery) -> str:
+    return query.value if query.mode == "text" else f"{query.mode}:{query.value}"
+
+
+async def bulk_lines(queries: List[SearchQuery], bulk_search, stats: BulkStats,
+                     budget: float = BULK_TIME_BUDGET, chunk_size: int = BULK_CHUNK_SIZE,
+                     limit: int = BULK_ROWS_PER_KEYWORD):
+    """Yield the result file's lines in batches, grouped by keyword.
+
+    Keywords are grouped by mode and looked up ``chunk_size`` at a time with
+    ``bulk_search(mode, values, limit, timeout)``, at most ``limit`` rows
+    each. Lookups stop once ``budget`` seconds have passed; the keywords
+    left over are listed at the end of the file.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + budget
+    by_mode = {}
+    for query in queries:
+        by_mode.setdefault(query.mode, []).append(query.value)
+
+    missed = []
+    unfinished = []
+    for mode, values in by_mode.items():
+        for start in range(0, len(values), chunk_size):
+            chunk = values[start:start + chunk_size]
+            found = set()
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                unfinished.extend(SearchQuery(mode, value) for value in chunk)
+                continue
+            results = bulk_search(mode, chunk, limit, remaining)
+            try:
+                async for value, rows, more in results:
+                    found.add(value)
+                    stats.matched += 1
+                    stats.rows += len(rows)
+                    label = keyword_label(SearchQuery(mode, value))
+                    count = f"{len(rows)}+" if more else str(len(rows))
+                    yield [f"### {label} ({count} sonuç)"] + rows + [""]
+            except asyncio.TimeoutError:
+                unfinished.extend(SearchQuery(mode, value) for value in chunk if value not in found)
+                continue
+            finally:
+                # Stopping early must release the backend's cursor right away.
+                await results.aclose()
+            missed.extend(SearchQuery(mode, value) for value in chunk if value not in found)
+
+    stats.unfinished = len(unfinished)
+    if missed:
+        yield [f"### Sonuç bulunamayanlar ({len(missed)})"] + [keyword_label(q) for q in missed] + [""]
+    if unfinished:
+        yield ([f"### Zaman bütçesi aşıldığı için aranamayanlar ({len(unfinished)})"]
+               + [keyword_label(q) for q in unfinished] + [""])
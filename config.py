@@ -0,0 +1,120 @@
+import os
+
+# Fetch environment variables directly
+DB_NAME = os.getenv("DB_NAME")
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_HOST = os.getenv("DB_HOST")
+DB_PORT = os.getenv("DB_PORT")
+TOKEN = os.getenv("TOKEN")
+
+# Storage backend: "postgres", or "offline" for the on-disk index built by offline_index.py.
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "postgres")
+OFFLINE_INDEX_DIR = os.getenv("OFFLINE_INDEX_DIR", "leak_index")
+
+# Search tuning
+# Trigram indexes cannot serve patterns shorter than three characters.
+MIN_KEYWORD_LENGTH = int(os.getenv("MIN_KEYWORD_LENGTH", "3"))
+# Rows fetched per round trip from the server-side search cursor.
+SEARCH_BATCH_SIZE = int(os.getenv("SEARCH_BATCH_SIZE", "5000"))
+# Partitions (one per source) searched at the same time by one search, each on its own connection.
+SEARCH_FANOUT = int(os.getenv("SEARCH_FANOUT", "4"))
+# Seconds one partition query may run per fetch before it is cancelled and reported as skipped.
+SEARCH_PARTITION_TIMEOUT = float(os.getenv("SEARCH_PARTITION_TIMEOUT", "30"))
+
+# Search jobs
+# Searches run at the same time; further searches wait in the queue.
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", "4"))
+# Searches waiting beyond this are refused until the queue drains.
+SEARCH_QUEUE_SIZE = int(os.getenv("SEARCH_QUEUE_SIZE", "100"))
+# Queued or running searches one user may have.
+SEARCH_USER_CONCURRENCY = int(os.getenv("SEARCH_USER_CONCURRENCY", "1"))
+# Searches one user may submit per SEARCH_USER_RATE_WINDOW seconds.
+SEARCH_USER_RATE_LIMIT = int(os.getenv("SEARCH_USER_RATE_LIMIT", "10"))
+SEARCH_USER_RATE_WINDOW = float(os.getenv("SEARCH_USER_RATE_WINDOW", "60"))
+# Seconds a search job may run, queries and upload included, before it is cancelled.
+SEARCH_JOB_TIMEOUT = float(os.getenv("SEARCH_JOB_TIMEOUT", "300"))
+
+# Bulk lookups (/bulk)
+# Telegram lets bots download files up to 20 MB.
+BULK_MAX_FILE_BYTES = int(os.getenv("BULK_MAX_FILE_BYTES", str(10 * 1024 * 1024)))
+# Unique keywords looked up per file; the rest are reported as dropped.
+BULK_MAX_KEYWORDS = int(os.getenv("BULK_MAX_KEYWORDS", "10000"))
+# Keywords sent to the database in one query.
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+# Rows returned per keyword; more are marked with "+".
+BULK_ROWS_PER_KEYWORD = int(os.getenv("BULK_ROWS_PER_KEYWORD", "1000"))
+# Seconds spent on lookups per file; keep below SEARCH_JOB_TIMEOUT to leave time for the upload.
+BULK_TIME_BUDGET = float(os.getenv("BULK_TIME_BUDGET", "120"))
+
+# Authorization cache
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+# Seconds a cached bot_users row is trusted; changes made outside the bot show up after this.
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))
+
+# Result export
+# Caps on what a single search sends back; the file is marked as truncated beyond them.
+SEARCH_MAX_ROWS = int(os.getenv("SEARCH_MAX_ROWS", "1000000"))
+# Uncompressed bytes; Telegram rejects bot uploads above 50 MB.
+SEARCH_MAX_BYTES = int(os.getenv("SEARCH_MAX_BYTES", str(45 * 1024 * 1024)))
+# Results are kept in memory up to this size and spill to a temporary file beyond it.
+EXPORT_SPOOL_BYTES = int(os.getenv("EXPORT_SPOOL_BYTES", str(8 * 1024 * 1024)))
+# "gzip" or "none".
+EXPORT_COMPRESSION = os.getenv("EXPORT_COMPRESSION", "gzip")
+
+# Search result cache
+# Total bytes of finished result files kept for repeated searches.
+RESULT_CACHE_BYTES = int(os.getenv("RESULT_CACHE_BYTES", str(64 * 1024 * 1024)))
+# Larger results are sent but not cached.
+RESULT_CACHE_MAX_ENTRY_BYTES = int(os.getenv("RESULT_CACHE_MAX_ENTRY_BYTES", str(16 * 1024 * 1024)))
+
+# Metrics and slow queries
+# Prometheus endpoint; a port of 0 disables it.
+METRICS_ADDR = os.getenv("METRICS_ADDR", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+# Queries taking longer than this (seconds of database time) are counted as slow.
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_SECONDS", "5"))
+# Share of slow queries whose plan is logged, one at a time: EXPLAIN (ANALYZE,
+# BUFFERS) for completed queries, plain EXPLAIN for timed-out ones.
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_SAMPLE_RATE", "0.1"))
+
+# Connection pool
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "20"))
+# Connections left for handlers (user lookups, /sources) and the slow-query
+# EXPLAIN while every search worker fans out in full.
+DB_POOL_RESERVED = int(os.getenv("DB_POOL_RESERVED", "4"))
+# Seconds a handler waits for a free connection before giving up.
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Seconds between background health checks of idle connections.
+DB_POOL_CHECK_INTERVAL = float(os.getenv("DB_POOL_CHECK_INTERVAL", "60"))
+# Seconds the pool keeps trying to reconnect before reporting the server as lost.
+DB_RECONNECT_TIMEOUT = float(os.getenv("DB_RECONNECT_TIMEOUT", "300"))
+
+
+def require_db_config():
+    """Raise if any database environment variable is missing."""
+    if not DB_NAME or not DB_USER or not DB_PASSWORD or not DB_HOST or not DB_PORT:
+        raise EnvironmentError("Veritabanı yapılandırması eksik. Çevresel değişkenleri kontrol edin.")
+
+
+def db_params() -> dict:
+    """Connection keyword arguments for the configured database."""
+    return {
+        "dbname": DB_NAME,
+        "user": DB_USER,
+        "password": DB_PASSWORD,
+        "host": DB_HOST,
+        "port": DB_PORT,
+    }
+
+
+def require_pool_capacity():
+    """Raise if busy search workers could take every pooled connection."""
+    needed = SEARCH_WORKERS * SEARCH_FANOUT + DB_POOL_RESERVED
+    if needed > DB_POOL_MAX_SIZE:
+        raise EnvironmentError(
+            f"DB_POOL_MAX_SIZE ({DB_POOL_MAX_SIZE}) yetersiz: SEARCH_WORKERS x SEARCH_FANOUT + DB_POOL_RESERVED "
+            f"= {SEARCH_WORKERS} x {SEARCH_FANOUT} + {DB_POOL_RESERVED} = {needed} bağlantı gerekiyor. "
+            "Havuzu büyütün veya SEARCH_WORKERS/SEARCH_FANOUT değerini düşürün."
+        )
@@ -0,0 +1,397 @@
+import asyncio
+import contextlib
+import logging
+import random
+import time
+from typing import List, Optional
+
+import psycopg
+from psycopg import sql
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+
+from config import (
+    DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT,
+    DB_POOL_CHECK_INTERVAL, DB_RECONNECT_TIMEOUT, SEARCH_BATCH_SIZE,
+    SEARCH_FANOUT, SEARCH_PARTITION_TIMEOUT, SLOW_QUERY_SECONDS, SLOW_QUERY_SAMPLE_RATE,
+    USER_CACHE_SIZE, USER_CACHE_TTL, db_params, require_pool_capacity,
+)
+from cache import MISSING, TTLCache
+from metrics import POOL_ACQUIRE_SECONDS, QUERY_SECONDS, QUERY_ROWS, SLOW_QUERIES
+from models import BotUser, Source
+from query import SearchQuery, like_pattern
+
+
+# Run against one partition of leaks at a time; {} is the partition name.
+SEARCH_QUERIES = {
+    "text": "SELECT data FROM {} WHERE data ILIKE %s ESCAPE '\\'",
+    "email": "SELECT data FROM {} WHERE email = %s",
+    "domain": "SELECT data FROM {} WHERE email_domain = %s",
+    "username": "SELECT data FROM {} WHERE username = %s",
+}
+
+# /bulk lookups: one query per chunk of keywords, at most %(limit)s rows each,
+# grouped by keyword. Typed modes join on the B-tree indexed columns, text
+# keywords on the trigram index.
+BULK_MATCHES = {
+    "text": "l.data ILIKE k.pattern ESCAPE '\\'",
+    "email": "l.email = k.keyword",
+    "domain": "l.email_domain = k.keyword",
+    "username": "l.username = k.keyword",
+}
+BULK_SQL = """
+    SELECT k.keyword, m.data
+    FROM unnest(%(keywords)s::text[], %(patterns)s::text[]) WITH ORDINALITY AS k(keyword, pattern, ord)
+    CROSS JOIN LATERAL (SELECT l.data FROM leaks l WHERE {} LIMIT %(limit)s) m
+    ORDER BY k.ord
+"""
+BULK_QUERIES = {mode: BULK_SQL.format(match) for mode, match in BULK_MATCHES.items()}
+
+# Shared by every handler; created by open_pool() at startup.
+pool: Optional[AsyncConnectionPool] = None
+_health_task: Optional[asyncio.Task] = None
+# Background EXPLAIN of a sampled slow query; at most one runs at a time.
+_explain_task: Optional[asyncio.Task] = None
+# bot_users rows keyed by chat_id; None records a user known to be unregistered.
+user_cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+
+# --------------------------------------------------------------
+# Pool lifecycle
+# --------------------------------------------------------------
+async def open_pool():
+    """Create the connection pool and start the periodic health check."""
+    global pool, _health_task
+    require_pool_capacity()
+    pool = AsyncConnectionPool(
+        kwargs=db_params(),
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        timeout=DB_POOL_TIMEOUT,
+        reconnect_timeout=DB_RECONNECT_TIMEOUT,
+        # Validate each connection before handing it out so a server restart
+        # surfaces as a fresh connection instead of a failed query.
+        check=AsyncConnectionPool.check_connection,
+        open=False,
+    )
+    await pool.open(wait=True, timeout=DB_POOL_TIMEOUT)
+    _health_task = asyncio.create_task(_health_check_loop())
+    logging.info(f"Veritabanı havuzu açıldı (min={DB_POOL_MIN_SIZE}, max={DB_POOL_MAX_SIZE}).")
+
+async def close_pool():
+    """Stop the background tasks and close every pooled connection."""
+    global pool, _health_task, _explain_task
+    for task in (_health_task, _explain_task):
+        if task:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    _health_task = _explain_task = None
+    if pool:
+        await pool.close()
+        pool = None
+
+async def _health_check_loop():
+    while True:
+        await asyncio.sleep(DB_POOL_CHECK_INTERVAL)
+        try:
+            await pool.check()
+        except Exception as e:
+            logging.error(f"Havuz sağlık kontrolü hatası: {e}")
+
+@contextlib.asynccontextmanager
+async def _connection(name: str):
+    """Pooled connection, with the wait for it recorded under ``name``."""
+    started = time.perf_counter()
+    async with pool.connection() as conn:
+        POOL_ACQUIRE_SECONDS.labels(name).observe(time.perf_counter() - started)
+        yield conn
+
+class _DbClock:
+    """Time spent awaiting the database while streaming one query's rows."""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.rows = 0
+
+    async def run(self, awaitable):
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.seconds += time.perf_counter() - started
+
+def _query_status(error: BaseException) -> str:
+    """Status label of a query stopped by ``error``."""
+    if isinstance(error, psycopg.errors.QueryCanceled):
+        return "timeout"
+    if isinstance(error, (asyncio.CancelledError, GeneratorExit)):
+        return "cancelled"
+    return "error"
+
+def _record_query(name: str, clock: _DbClock, statement, params, status: str = "ok"):
+    """Record a streamed query under ``status``; sample slow ones for a logged
+    EXPLAIN. Completed queries are re-run under EXPLAIN ANALYZE, timed-out
+    ones only planned, and cancelled or failed ones never re-run."""
+    global _explain_task
+    QUERY_SECONDS.labels(name, status).observe(clock.seconds)
+    QUERY_ROWS.labels(name, status).inc(clock.rows)
+    # A timed-out query is slow whatever SLOW_QUERY_SECONDS says.
+    if clock.seconds < SLOW_QUERY_SECONDS and status != "timeout":
+        return
+    SLOW_QUERIES.labels(name, status).inc()
+    if status not in ("ok", "timeout"):
+        return
+    if (_explain_task and not _explain_task.done()) or random.random() >= SLOW_QUERY_SAMPLE_RATE:
+        return
+    _explain_task = asyncio.create_task(
+        _explain(name, clock.seconds, statement, params, analyze=status == "ok")
+    )
+
+async def _explain(name: str, seconds: float, statement, params, analyze: bool):
+    """Log the plan of a slow query: re-run under EXPLAIN (ANALYZE, BUFFERS)
+    when ``analyze``, otherwise only planned."""
+    if isinstance(statement, str):
+        statement = sql.SQL(statement)
+    explain = "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN "
+    try:
+        async with _connection("explain") as conn:
+            await conn.execute(
+                "SELECT set_config('statement_timeout', %s, true)",
+                (str(int(SEARCH_PARTITION_TIMEOUT * 1000)),),
+            )
+            cur = await conn.execute(sql.SQL(explain) + statement, params)
+            plan = "\n".join(row[0] for row in await cur.fetchall())
+        if analyze:
+            logging.warning(f"Yavaş sorgu ({name}, {seconds:.1f} sn), plan:\n{plan}")
+        else:
+            logging.warning(f"Zaman aşımına uğrayan sorgu ({name}, {seconds:.1f} sn), plan:\n{plan}")
+    except Exception as e:
+        logging.error(f"EXPLAIN hatası: {e}")
+
+async def _run(operation, name: str):
+    """Run ``operation(conn)`` on a pooled connection, timed under ``name``.
+
+    A connection dropped by the server mid-operation is retried once after
+    the pool has discarded its broken connections. PoolTimeout is an
+    OperationalError too, but an exhausted pool is not a dropped connection;
+    it is raised at once instead of waiting another DB_POOL_TIMEOUT.
+    """
+    for attempt in range(2):
+        try:
+            async with _connection(name) as conn:
+                started, status = time.perf_counter(), "ok"
+                try:
+                    return await operation(conn)
+                except BaseException as e:
+                    status = _query_status(e)
+                    raise
+                finally:
+                    QUERY_SECONDS.labels(name, status).observe(time.perf_counter() - started)
+        except PoolTimeout:
+            raise
+        except psycopg.OperationalError as e:
+            if attempt:
+                raise
+            logging.warning(f"Veritabanı bağlantısı koptu, yeniden deneniyor: {e}")
+            await pool.check()
+
+# --------------------------------------------------------------
+# Database Functions
+# --------------------------------------------------------------
+async def get_user(chat_id: int) -> Optional[BotUser]:
+    """Return the user's bot_users row, or None if unregistered or on error.
+
+    Rows (and their absence) are served from user_cache while fresh.
+    """
+    user = user_cache.get(chat_id)
+    if user is not MISSING:
+        return user
+
+    async def operation(conn):
+        cur = await conn.execute(
+            "SELECT chat_id, is_authorized, is_admin FROM bot_users WHERE chat_id = %s",
+            (chat_id,),
+        )
+        return await cur.fetchone()
+
+    try:
+        row = await _run(operation, "get_user")
+    except Exception as e:
+        logging.error(f"get_user hatası: {e}")
+        return None
+    user = BotUser(*row) if row else None
+    user_cache.set(chat_id, user)
+    return user
+
+async def ensure_user_in_db(chat_id: int):
+    """Ensure the user exists in bot_users table."""
+    async def operation(conn):
+        cur = await conn.execute(
+            "INSERT INTO bot_users (chat_id, is_authorized, is_admin) VALUES (%s, FALSE, FALSE) "
+            "ON CONFLICT (chat_id) DO UPDATE SET chat_id = EXCLUDED.chat_id "
+            "RETURNING chat_id, is_authorized, is_admin",
+            (chat_id,),
+        )
+        return await cur.fetchone()
+
+    try:
+        user_cache.set(chat_id, BotUser(*await _run(operation, "ensure_user_in_db")))
+    except Exception as e:
+        user_cache.invalidate(chat_id)
+        logging.error(f"ensure_user_in_db hatası: {e}")
+
+async def authorize_user(chat_id: int) -> bool:
+    """Set is_authorized for the user; False if the user is not registered."""
+    async def operation(conn):
+        cur = await conn.execute(
+            "UPDATE bot_users SET is_authorized = TRUE WHERE chat_id = %s "
+            "RETURNING chat_id, is_authorized, is_admin",
+            (chat_id,),
+        )
+        return await cur.fetchone()
+
+    try:
+        row = await _run(operation, "authorize_user")
+    except Exception:
+        user_cache.invalidate(chat_id)
+        raise
+    user_cache.set(chat_id, BotUser(*row) if row else None)
+    return row is not None
+
+async def get_data_generation() -> int:
+    """Current value of the counter bumped by every change to leaks."""
+    async def operation(conn):
+        cur = await conn.execute("SELECT generation FROM data_generation")
+        return await cur.fetchone()
+
+    row = await _run(operation, "get_data_generation")
+    return row[0] if row else 0
+
+async def list_sources() -> List[Source]:
+    """Every imported dump, by name."""
+    async def operation(conn):
+        cur = await conn.execute(
+            "SELECT name, partition_name, format, imported_at, row_count FROM sources ORDER BY name"
+        )
+        return await cur.fetchall()
+
+    return [Source(*row) for row in await _run(operation, "list_sources")]
+
+def cache_stats() -> dict:
+    return user_cache.stats()
+
+async def _search_partition(source: Source, query: SearchQuery, batch_size: int, results: asyncio.Queue):
+    """Stream one partition's matches into ``results``."""
+    statement = sql.SQL(SEARCH_QUERIES[query.mode]).format(sql.Identifier(source.partition_name))
+    param = like_pattern(query.value) if query.mode == "text" else query.value
+
+    clock, status = _DbClock(), "ok"
+    try:
+        async with _connection("search") as conn:
+            # Bounds each fetch, not the whole scan; time spent waiting for the
+            # consumer to drain the queue does not count against it.
+            await conn.execute(
+                "SELECT set_config('statement_timeout', %s, true)",
+                (str(int(SEARCH_PARTITION_TIMEOUT * 1000)),),
+            )
+            async with conn.cursor(name="search_in_leaks") as cur:
+                await clock.run(cur.execute(statement, (param,)))
+                while True:
+                    rows = await clock.run(cur.fetchmany(batch_size))
+                    if not rows:
+                        break
+                    clock.rows += len(rows)
+                    await results.put([row[0] for row in rows])
+    except BaseException as e:
+        status = _query_status(e)
+        raise
+    finally:
+        _record_query("search", clock, statement, (param,), status)
+
+async def search_in_leaks(query: SearchQuery, batch_size: int = SEARCH_BATCH_SIZE,
+                          skipped: Optional[list] = None):
+    """Yield rows matching the query in batches of ``batch_size``.
+
+    leaks is partitioned by source; up to SEARCH_FANOUT partitions are
+    searched at once, each on its own pooled connection and named
+    server-side cursor, and batches are yielded as they arrive. Free-text
+    queries are shaped so the pg_trgm GIN index created by migrate.py can
+    serve them; typed queries use the B-tree indexes on the parsed columns.
+    A partition whose query exceeds SEARCH_PARTITION_TIMEOUT stops
+    contributing rows and its source name is appended to ``skipped``; other
+    errors propagate to the caller.
+    """
+    sources = await list_sources()
+    if query.sources:
+        sources = [source for source in sources if source.name in query.sources]
+    results = asyncio.Queue(maxsize=SEARCH_FANOUT * 2)
+    limit = asyncio.Semaphore(SEARCH_FANOUT)
+    done = object()
+
+    async def search(source):
+        try:
+            async with limit:
+                await _search_partition(source, query, batch_size, results)
+        except psycopg.errors.QueryCanceled:
+            logging.warning(f"Arama zaman aşımı, kaynak atlandı: {source.name}")
+            if skipped is not None:
+                skipped.append(source.name)
+        except Exception as e:
+            await results.put(e)
+        # Not reached when cancelled: nobody is reading the queue any more.
+        await results.put(done)
+
+    tasks = [asyncio.create_task(search(source)) for source in sources]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            item = await results.get()
+            if item is done:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        # Closing the generator early cancels the partition queries still running.
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def bulk_search(mode: str, keywords: List[str], limit: int, timeout: float):
+    """Yield (keyword, rows, more) for every keyword in ``keywords`` that matches.
+
+    All keywords share one query; ``more`` is set when a keyword has over
+    ``limit`` rows. Raises asyncio.TimeoutError once the query has run for
+    ``timeout`` seconds, after yielding what it found until then.
+    """
+    patterns = [like_pattern(keyword) for keyword in keywords] if mode == "text" else keywords
+    params = {"keywords": keywords, "patterns": patterns, "limit": limit + 1}
+    clock, status = _DbClock(), "ok"
+    try:
+        async with _connection("bulk") as conn:
+            await conn.execute(
+                "SELECT set_config('statement_timeout', %s, true)",
+                (str(max(1, int(timeout * 1000))),),
+            )
+            async with conn.cursor(name="bulk_search") as cur:
+                await clock.run(cur.execute(BULK_QUERIES[mode], params))
+                keyword, rows = None, []
+                while True:
+                    batch = await clock.run(cur.fetchmany(SEARCH_BATCH_SIZE))
+                    if not batch:
+                        break
+                    clock.rows += len(batch)
+                    for found, data in batch:
+                        if found != keyword:
+                            if rows:
+                                yield keyword, rows[:limit], len(rows) > limit
+                            keyword, rows = found, []
+                        rows.append(data)
+                if rows:
+                    yield keyword, rows[:limit], len(rows) > limit
+    except BaseException as e:
+        status = _query_status(e)
+        if status == "timeout":
+            raise asyncio.TimeoutError
+        raise
+    finally:
+        _record_query("bulk", clock, BULK_QUERIES[mode], params, status)
@@ -0,0 +1,110 @@
+import argparse
+import time
+
+import psycopg
+
+from config import db_params, require_db_config
+from ingest import BLOOM_HEADROOM, open_bloom
+from migrate import BUMP_GENERATION_SQL
+
+# Hashes one id range of rows that predate line_hash. A row is deleted instead
+# when its content is already stored with a hash in any source, including a
+# dump imported after it, or repeats a lower id in the same range. So the
+# oldest unhashed copy survives only if no hashed copy exists yet.
+# Unhashed rows only exist in the legacy partition, which is targeted directly:
+# its primary key serves the id ranges, while the source partitions have no
+# id index and would be scanned in full for every batch.
+DEDUPE_SQL = """
+    WITH ranked AS (
+        SELECT id, decode(md5(data), 'hex') AS hash,
+               row_number() OVER (PARTITION BY md5(data) ORDER BY id) AS rn
+        FROM leaks_legacy
+        WHERE id >= %(start)s AND id < %(end)s AND line_hash IS NULL
+    ),
+    duplicates AS (
+        SELECT id FROM ranked r
+        WHERE r.rn > 1 OR EXISTS (SELECT 1 FROM leaks o WHERE o.line_hash = r.hash)
+    ),
+    deleted AS (
+        DELETE FROM leaks_legacy WHERE id IN (SELECT id FROM duplicates) RETURNING id, source_id
+    ),
+    recounted AS (
+        UPDATE sources SET row_count = sources.row_count - d.rows
+        FROM (SELECT source_id, count(*) AS rows FROM deleted GROUP BY source_id) d
+        WHERE sources.id = d.source_id
+    ),
+    hashed AS (
+        UPDATE leaks_legacy SET line_hash = r.hash
+        FROM ranked r
+        WHERE leaks_legacy.id = r.id AND r.id NOT IN (SELECT id FROM duplicates)
+        RETURNING leaks_legacy.id
+    )
+    SELECT (SELECT count(*) FROM deleted), (SELECT count(*) FROM hashed)
+"""
+
+
+def dedupe_table(conn, batch_rows):
+    """Backfill line_hash and delete duplicate rows, one committed id range at a time."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT min(id), max(id) FROM leaks_legacy WHERE line_hash IS NULL")
+        first, last = cur.fetchone()
+    conn.commit()
+    if first is None:
+        print("Tüm satırların özeti zaten var.")
+        return
+
+    started = time.perf_counter()
+    deleted_total = hashed_total = 0
+    for start in range(first, last + 1, batch_rows):
+        with conn.transaction(), conn.cursor() as cur:
+            cur.execute(DEDUPE_SQL, {"start": start, "end": start + batch_rows})
+            deleted, hashed = cur.fetchone()
+            if deleted:
+                cur.execute(BUMP_GENERATION_SQL)
+        deleted_total += deleted
+        hashed_total += hashed
+        done = min(start + batch_rows, last + 1) - first
+        print(
+            f"  id {start}-{start + batch_rows - 1}: {hashed} özetlendi, {deleted} silindi | "
+            f"%{done * 100 // (last - first + 1)}, {time.perf_counter() - started:.0f} sn"
+        )
+    total = deleted_total + hashed_total
+    ratio = deleted_total / total if total else 0
+    print(f"Tamamlandı: {hashed_total} satır kaldı, {deleted_total} yinelenen silindi (%{ratio * 100:.1f}).")
+
+
+def fill_bloom(conn, path, capacity, error_rate):
+    """Add every stored line_hash to the ingest Bloom filter."""
+    bloom = open_bloom(conn, path, capacity, error_rate)
+    added = 0
+    try:
+        with conn.transaction(), conn.cursor(name="fill_bloom") as cur:
+            cur.itersize = 100_000
+            cur.execute("SELECT line_hash FROM leaks WHERE line_hash IS NOT NULL")
+            for (digest,) in cur:
+                bloom.add(bytes(digest))
+                added += 1
+        bloom.flush()
+    finally:
+        bloom.close()
+    print(f"Bloom filtresine {added} özet eklendi: {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mevcut leaks tablosundaki yinelenen satırları siler ve Bloom filtresini doldurur."
+    )
+    parser.add_argument("--batch-rows", type=int, default=1_000_000,
+                        help="Tek işlemde taranan id aralığı")
+    parser.add_argument("--bloom", default="leaks.bloom", help="Doldurulacak Bloom filtresi dosyası")
+    parser.add_argument("--bloom-capacity", type=int,
+                        help=f"Yeni filtrenin satır kapasitesi; varsayılan tablodaki satırların {BLOOM_HEADROOM} katı")
+    parser.add_argument("--bloom-error-rate", type=float, default=0.001)
+    parser.add_argument("--no-bloom", action="store_true", help="Yalnızca tabloyu temizle")
+    args = parser.parse_args()
+
+    require_db_config()
+    with psycopg.connect(**db_params()) as conn:
+        dedupe_table(conn, args.batch_rows)
+        if not args.no_bloom:
+            fill_bloom(conn, args.bloom, args.bloom_capacity, args.bloom_error_rate)
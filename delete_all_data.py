@@ -1,19 +1,21 @@
-import psycopg2
+import argparse
+
+import psycopg
+
+from config import db_params, require_db_config
+from migrate import BUMP_GENERATION_SQL, drop_source
 
 def clear_table():
+    conn = None
     try:
         # Veritabanı bağlantısı
-        conn = psycopg2.connect(
-            dbname="railway",
-            user="postgres",
-            password="GIwrtWvJmhTxqjokahbkaXmFAypVsYtu",
-            host="viaduct.proxy.rlwy.net",
-            port="39942"
-        )
+        conn = psycopg.connect(**db_params())
         cursor = conn.cursor()
 
-        # Verileri temizleme
+        # Verileri temizleme; önbellekteki arama sonuçları da geçersiz olur
         cursor.execute("TRUNCATE TABLE leaks RESTART IDENTITY;")
+        cursor.execute("UPDATE sources SET row_count = 0;")
+        cursor.execute(BUMP_GENERATION_SQL)
         conn.commit()
 
         print("Tüm veriler başarıyla silindi.")
@@ -26,5 +28,24 @@ def clear_table():
             cursor.close()
             conn.close()
 
+def clear_source(name):
+    """Drop one dump's partition; instant regardless of its size."""
+    try:
+        with psycopg.connect(**db_params()) as conn:
+            if drop_source(conn, name.strip().lower()):
+                print(f"'{name}' kaynağı silindi.")
+            else:
+                print(f"'{name}' adında bir kaynak yok.")
+    except Exception as e:
+        print(f"[HATA] {e}")
+
 if __name__ == "__main__":
-    clear_table()
+    parser = argparse.ArgumentParser(description="Sızıntı verilerini siler.")
+    parser.add_argument("--source", help="Yalnızca bu kaynağın (dökümün) bölümünü sil")
+    args = parser.parse_args()
+
+    require_db_config()
+    if args.source:
+        clear_source(args.source)
+    else:
+        clear_table()
@@ -0,0 +1,93 @@
+import hashlib
+import os
+
+# Reading, decoding and cleaning dump files, shared by ingest.py and the
+# offline index. Only the standard library is used here, so the offline
+# backend does not need the PostgreSQL driver.
+
+# Bytes fed to chardet from the start of each file.
+ENCODING_SAMPLE_BYTES = 1024 * 1024
+# Chunks handed to a worker process; cut on the last newline so lines stay whole.
+CHUNK_BYTES = 8 * 1024 * 1024
+# Single-byte and UTF-8 inputs can be split on b"\n"; wide encodings cannot.
+UNSUPPORTED_ENCODINGS = ("utf-16", "utf-32")
+
+
+def iter_input_files(paths):
+    """Expand files and directories (recursively, in name order) into file paths."""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def detect_encoding(file_path, sample_bytes=ENCODING_SAMPLE_BYTES):
+    """Guess the file's encoding from its first ``sample_bytes`` bytes.
+
+    chardet is imported here so the offline backend can search, and build
+    with --encoding, without it installed.
+    """
+    from chardet.universaldetector import UniversalDetector
+
+    detector = UniversalDetector()
+    with open(file_path, 'rb') as f:
+        sample = f.read(sample_bytes)
+    for start in range(0, len(sample), 64 * 1024):
+        detector.feed(sample[start:start + 64 * 1024])
+        if detector.done:
+            break
+    detector.close()
+    encoding = (detector.result['encoding'] or 'utf-8').lower()
+    # A pure-ASCII sample says nothing about the rest of the file; UTF-8 is a superset.
+    return 'utf-8' if encoding == 'ascii' else encoding
+
+
+def iter_chunks(file_path, start_offset=0, chunk_bytes=CHUNK_BYTES):
+    """Yield (end_offset, data) blocks that end on a line boundary."""
+    with open(file_path, 'rb') as f:
+        f.seek(start_offset)
+        offset = start_offset
+        pending = b''
+        while True:
+            block = f.read(chunk_bytes)
+            if not block:
+                break
+            block = pending + block
+            cut = block.rfind(b'\n') + 1
+            if cut == 0:
+                pending = block
+                continue
+            pending = block[cut:]
+            offset += cut
+            yield offset, block[:cut]
+        if pending:
+            yield offset + len(pending), pending
+
+
+def clean_lines(data, encoding):
+    """Decode a raw chunk and yield its lines without null bytes, surrounding
+    whitespace or empty lines.
+
+    Lines are split on '\n' only, like the chunker; str.splitlines() would
+    also split on form feeds, NEL (0x85 in ISO-8859-9) and other separators
+    that can appear inside a leaked password.
+    """
+    for line in data.decode(encoding, errors='replace').split('\n'):
+        line = line.rstrip('\r').replace('\x00', '').strip()
+        if line:
+            yield line
+
+
+def line_hash(line):
+    """Content hash of a cleaned line; equal to decode(md5(data), 'hex') in SQL."""
+    return hashlib.md5(line.encode('utf-8')).digest()
+
+
+def source_name(file_path, source=None):
+    """Name of the source a file is imported into: ``source``, or the file name without extension."""
+    name = source or os.path.splitext(os.path.basename(file_path))[0]
+    return name.strip().lower()
@@ -0,0 +1,136 @@
+import asyncio
+import gzip
+import re
+import tempfile
+from typing import IO, NamedTuple
+
+from cache import MISSING, ByteLRUCache
+from config import (
+    SEARCH_MAX_ROWS, SEARCH_MAX_BYTES, EXPORT_SPOOL_BYTES, EXPORT_COMPRESSION,
+    RESULT_CACHE_BYTES, RESULT_CACHE_MAX_ENTRY_BYTES,
+)
+from query import SearchQuery
+
+
+class SearchExport(NamedTuple):
+    file: IO[bytes]
+    filename: str
+    rows: int
+    truncated: bool
+
+
+class SearchResult(NamedTuple):
+    payload: bytes
+    filename: str
+    rows: int
+    truncated: bool
+    skipped: tuple = ()  # sources that timed out; their rows may be incomplete
+
+
+# Finished results keyed by (mode, value, sources, data generation). Ingest and
+# delete_all_data.py bump the generation, so stale entries are never hit
+# again and age out of the LRU.
+result_cache = ByteLRUCache(RESULT_CACHE_BYTES)
+# Searches currently running, keyed like result_cache; identical concurrent
+# searches await the same task instead of querying again.
+_in_flight = {}
+coalesced = 0
+
+
+def export_filename(label: str) -> str:
+    """File name for a result document, safe to send whatever the label contains."""
+    stem = re.sub(r"[^\w.@-]+", "_", label).strip("._")[:64] or "sonuclar"
+    return f"{stem}.txt.gz" if EXPORT_COMPRESSION == "gzip" else f"{stem}.txt"
+
+
+async def export_results(label: str, batches, max_rows: int = SEARCH_MAX_ROWS,
+                         max_bytes: int = SEARCH_MAX_BYTES) -> SearchExport:
+    """Write result batches into a spooled, optionally gzip-compressed buffer.
+
+    Memory use is bounded by EXPORT_SPOOL_BYTES whatever the result size;
+    writing stops at ``max_rows`` rows or ``max_bytes`` uncompressed bytes and
+    the export is flagged as truncated. The caller owns and closes ``file``.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES)
+    out = gzip.GzipFile(fileobj=spool, mode="wb") if EXPORT_COMPRESSION == "gzip" else spool
+    rows = 0
+    written = 0
+    truncated = False
+    try:
+        async for batch in batches:
+            chunk = []
+            for line in batch:
+                data = (line + "\n").encode("utf-8")
+                if rows >= max_rows or written + len(data) > max_bytes:
+                    truncated = True
+                    break
+                chunk.append(data)
+                rows += 1
+                written += len(data)
+            # Compression and spilling to disk stay off the event loop.
+            await asyncio.to_thread(out.write, b"".join(chunk))
+            if truncated:
+                break
+        if out is not spool:
+            out.close()  # Writes the gzip trailer; the spool stays open.
+    except BaseException:
+        spool.close()
+        raise
+    finally:
+        # Stopping early must release the server-side cursor right away.
+        await batches.aclose()
+    spool.seek(0)
+    return SearchExport(spool, export_filename(label), rows, truncated)
+
+
+class _Flight:
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+async def _run_search(key, query: SearchQuery, search_in_leaks) -> SearchResult:
+    skipped = []
+    export = await export_results(query.label, search_in_leaks(query, skipped=skipped))
+    with export.file:
+        payload = await asyncio.to_thread(export.file.read)
+    result = SearchResult(payload, export.filename, export.rows, export.truncated, tuple(skipped))
+    # Results missing a timed-out source are incomplete; the next search retries.
+    if not skipped and len(payload) <= RESULT_CACHE_MAX_ENTRY_BYTES:
+        result_cache.set(key, result, len(payload))
+    return result
+
+
+async def search_results(query: SearchQuery, search_in_leaks, generation) -> SearchResult:
+    """Return the exported result for ``query``, from cache when possible.
+
+    Concurrent calls for the same query and generation share one search.
+    The shared search is only cancelled when every caller waiting on it has
+    been cancelled.
+    """
+    global coalesced
+    key = (query.mode, query.value, query.sources, generation)
+    result = result_cache.get(key)
+    if result is not MISSING:
+        return result
+
+    flight = _in_flight.get(key)
+    if flight is None:
+        flight = _in_flight[key] = _Flight(asyncio.create_task(_run_search(key, query, search_in_leaks)))
+        flight.task.add_done_callback(lambda _: _in_flight.pop(key, None))
+    else:
+        coalesced += 1
+
+    flight.waiters += 1
+    try:
+        return await asyncio.shield(flight.task)
+    except asyncio.CancelledError:
+        if flight.waiters == 1 and not flight.task.done():
+            flight.task.cancel()
+        raise
+    finally:
+        flight.waiters -= 1
+
+
+def cache_stats() -> dict:
+    return dict(result_cache.stats(), coalesced=coalesced, in_flight=len(_in_flight))
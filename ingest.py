@@ -0,0 +1,337 @@
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import psycopg
+
+from bloom import BloomFilter
+from config import db_params, require_db_config
+from dumps import (
+    CHUNK_BYTES, UNSUPPORTED_ENCODINGS, clean_lines, detect_encoding, iter_chunks, iter_input_files, line_hash,
+    source_name,
+)
+from migrate import BUMP_GENERATION_SQL, ensure_source
+from parsers import PARSERS, ParsedLine, get_parser
+
+COLUMNS = ", ".join(("data",) + ParsedLine._fields + ("line_hash",))
+# Rows go through a per-transaction staging table so duplicates that slip
+# past the Bloom filter are dropped by an anti-join against every partition's
+# line_hash index. Concurrent imports serialize on an advisory lock for the
+# insert step, so two of them cannot add the same line at once.
+STAGING_SQL = f"""
+    CREATE TEMP TABLE IF NOT EXISTS leaks_staging
+    ON COMMIT DELETE ROWS AS SELECT {COLUMNS} FROM leaks WITH NO DATA
+"""
+COPY_SQL = f"COPY leaks_staging ({COLUMNS}) FROM STDIN"
+INSERT_LOCK_SQL = "SELECT pg_advisory_xact_lock(hashtext('leaks_ingest'))"
+INSERT_SQL = f"""
+    INSERT INTO leaks ({COLUMNS}, source_id)
+    SELECT DISTINCT ON (line_hash) {COLUMNS}, %s FROM leaks_staging s
+    WHERE NOT EXISTS (SELECT 1 FROM leaks l WHERE l.line_hash = s.line_hash)
+"""
+SOURCE_ROWS_SQL = "UPDATE sources SET row_count = row_count + %s WHERE id = %s"
+STORED_ROWS_SQL = "SELECT coalesce(sum(row_count), 0) FROM sources"
+EXISTING_SQL = "SELECT line_hash FROM leaks WHERE line_hash = ANY(%s)"
+
+# A new Bloom filter is sized for this many times the rows already stored, so
+# the table can grow before its false-positive rate climbs; never below the floor.
+BLOOM_HEADROOM = 2
+BLOOM_MIN_CAPACITY = 100_000_000
+
+# --------------------------------------------------------------
+# Cleaning workers
+# --------------------------------------------------------------
+def copy_field(value):
+    """Encode one value for COPY text format."""
+    if value is None:
+        return '\\N'
+    return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\r', '\\r').replace('\n', '\\n')
+
+
+class CleanedChunk(NamedTuple):
+    block: bytes  # COPY rows for lines the Bloom filter has not seen
+    hashes: list  # content hashes of those rows
+    maybe: list  # (hash, COPY row) pairs the Bloom filter has probably seen
+    lines: int  # non-empty lines in the chunk
+    repeated: int  # lines repeating an earlier line of the same chunk
+
+
+# Set in each worker process by init_worker().
+_bloom = None
+
+
+def init_worker(bloom_path):
+    global _bloom
+    _bloom = BloomFilter(bloom_path, writable=True) if bloom_path else None
+
+
+def clean_chunk(task):
+    """Decode a raw chunk into COPY text-format rows, split by the Bloom filter.
+
+    Runs in a worker process. Each cleaned line is split into lookup fields
+    by the dump's record parser and hashed. Lines whose hash the
+    shared Bloom filter already holds are returned separately so the caller
+    can confirm them against the database; the others are added to it.
+    """
+    data, encoding, format_name = task
+    parse = get_parser(format_name)
+    out = []
+    hashes = []
+    maybe = []
+    seen = set()
+    lines = 0
+    for line in clean_lines(data, encoding):
+        lines += 1
+        digest = line_hash(line)
+        if digest in seen:
+            continue
+        seen.add(digest)
+        row = '\t'.join(copy_field(value) for value in (line,) + parse(line) + ('\\x' + digest.hex(),))
+        if _bloom is not None and digest in _bloom:
+            maybe.append((digest, row))
+            continue
+        if _bloom is not None:
+            _bloom.add(digest)
+        out.append(row)
+        hashes.append(digest)
+    block = ('\n'.join(out) + '\n').encode('utf-8') if out else b''
+    return CleanedChunk(block, hashes, maybe, lines, lines - len(seen))
+
+
+def iter_cleaned(executor, chunks, encoding, format_name, prefetch):
+    """Clean chunks in the pool, in input order, with at most ``prefetch`` in flight.
+
+    Yields (end_offset, raw_bytes, CleanedChunk) per chunk.
+    """
+    in_flight = deque()
+    for end_offset, data in chunks:
+        in_flight.append((end_offset, len(data), executor.submit(clean_chunk, (data, encoding, format_name))))
+        if len(in_flight) >= prefetch:
+            end_offset, raw_bytes, future = in_flight.popleft()
+            yield end_offset, raw_bytes, future.result()
+    while in_flight:
+        end_offset, raw_bytes, future = in_flight.popleft()
+        yield end_offset, raw_bytes, future.result()
+
+# --------------------------------------------------------------
+# Checkpoints
+# --------------------------------------------------------------
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    # Older checkpoints stored only the byte offset per file.
+    return {key: value if isinstance(value, dict) else {'offset': value}
+            for key, value in checkpoint.items()}
+
+
+def save_checkpoint(path, checkpoint):
+    """Atomically replace the checkpoint file."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+# --------------------------------------------------------------
+# Import
+# --------------------------------------------------------------
+class Progress:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.rows = 0
+        self.bytes = 0
+
+    def report(self, prefix=''):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        print(
+            f"{prefix}{self.rows} satır, {self.bytes / 1024 / 1024:.1f} MB | "
+            f"{self.rows / elapsed:,.0f} satır/sn, {self.bytes / 1024 / 1024 / elapsed:.1f} MB/sn"
+        )
+
+
+FILE_STATS = ('lines', 'repeated', 'known', 'conflicts', 'inserted')
+
+
+def report_duplicates(file_path, state):
+    lines = state.get('lines', 0)
+    inserted = state.get('inserted', 0)
+    ratio = (lines - inserted) / lines if lines else 0
+    print(
+        f"  {file_path}: {lines} satır, {inserted} yeni, yinelenen oranı %{ratio * 100:.1f} "
+        f"(dosya içi {state.get('repeated', 0)}, Bloom+DB {state.get('known', 0)}, "
+        f"eklemede çakışan {state.get('conflicts', 0)})"
+    )
+
+
+def find_existing(conn, digests):
+    """Return the subset of ``digests`` already stored in leaks."""
+    with conn.cursor() as cur:
+        cur.execute(EXISTING_SQL, (digests,))
+        return {bytes(row[0]) for row in cur.fetchall()}
+
+
+def stored_rows(conn):
+    """Rows stored across all sources, from the maintained per-source counts."""
+    with conn.cursor() as cur:
+        cur.execute(STORED_ROWS_SQL)
+        rows = cur.fetchone()[0]
+    conn.commit()
+    return rows
+
+
+def open_bloom(conn, path, capacity=None, error_rate=0.001):
+    """Open the Bloom filter at ``path``, creating it if missing.
+
+    Without ``capacity`` a new filter is sized for BLOOM_HEADROOM times the
+    rows already stored. An existing filter keeps its size; a warning is
+    printed when the table has outgrown it.
+    """
+    rows = stored_rows(conn)
+    if capacity is None:
+        capacity = max(BLOOM_MIN_CAPACITY, rows * BLOOM_HEADROOM)
+    bloom = BloomFilter.open_or_create(path, capacity, error_rate)
+    warn_bloom_capacity(bloom, rows)
+    return bloom
+
+
+def warn_bloom_capacity(bloom, rows):
+    if rows > bloom.capacity:
+        print(
+            f"Uyarı: Bloom filtresi ({bloom.path}) {bloom.capacity:,} satır için boyutlandırılmış, "
+            f"tabloda {rows:,} satır var (yanlış pozitif oranı ~%{bloom.false_positive_rate(rows) * 100:.1f}). "
+            f"Dosyayı silip `python dedupe.py` ile tablonun boyutuna göre yeniden oluşturun."
+        )
+
+
+def import_file(conn, verify_conn, executor, file_path, args, checkpoint, progress):
+    key = os.path.realpath(file_path)
+    size = os.path.getsize(file_path)
+    state = checkpoint.setdefault(key, {'offset': 0})
+    offset = state['offset']
+    if offset >= size:
+        print(f"Atlanıyor (zaten aktarıldı): {file_path}")
+        report_duplicates(file_path, state)
+        return
+
+    encoding = args.encoding or detect_encoding(file_path)
+    if encoding.startswith(UNSUPPORTED_ENCODINGS):
+        print(f"Atlanıyor ({encoding} desteklenmiyor, dosyayı UTF-8'e çevirin): {file_path}")
+        return
+    source = source_name(file_path, args.source)
+    source_id = ensure_source(conn, source, args.format)
+    resumed = f", {offset} bayttan devam" if offset else ''
+    print(f"Aktarılıyor: {file_path} (kaynak: {source}, kodlama: {encoding}{resumed})")
+
+    cleaned = iter_cleaned(executor, iter_chunks(file_path, offset, args.chunk_bytes),
+                           encoding, args.format, prefetch=args.workers * 2)
+    done = False
+    while not done:
+        batch_bytes = 0
+        batch = dict.fromkeys(FILE_STATS, 0)
+        copied = 0
+        # One transaction per batch: a crash loses at most the batch in progress,
+        # and the checkpoint only moves forward after the commit.
+        with conn.transaction(), conn.cursor() as cur:
+            cur.execute(STAGING_SQL)
+            with cur.copy(COPY_SQL) as copy:
+                for end_offset, raw_bytes, chunk in cleaned:
+                    if chunk.block:
+                        copy.write(chunk.block)
+                    copied += len(chunk.hashes)
+                    if chunk.maybe:
+                        # Bloom hits are usually real duplicates; confirm them on
+                        # the second connection while COPY keeps this one busy.
+                        existing = find_existing(verify_conn, [digest for digest, _ in chunk.maybe])
+                        fresh = [row for digest, row in chunk.maybe if digest not in existing]
+                        if fresh:
+                            copy.write(('\n'.join(fresh) + '\n').encode('utf-8'))
+                        copied += len(fresh)
+                        batch['known'] += len(chunk.maybe) - len(fresh)
+                    batch['lines'] += chunk.lines
+                    batch['repeated'] += chunk.repeated
+                    offset = end_offset
+                    batch_bytes += raw_bytes
+                    if batch_bytes >= args.batch_bytes:
+                        break
+                else:
+                    done = True
+            cur.execute(INSERT_LOCK_SQL)
+            cur.execute(INSERT_SQL, (source_id,))
+            batch['inserted'] = cur.rowcount
+            batch['conflicts'] = copied - cur.rowcount
+            if batch['inserted']:
+                cur.execute(SOURCE_ROWS_SQL, (batch['inserted'], source_id))
+                cur.execute(BUMP_GENERATION_SQL)
+        state['offset'] = offset
+        for name in FILE_STATS:
+            state[name] = state.get(name, 0) + batch[name]
+        save_checkpoint(args.checkpoint, checkpoint)
+        progress.rows += batch['lines']
+        progress.bytes += batch_bytes
+        progress.report(f"  {offset * 100 // max(size, 1)}% | ")
+    report_duplicates(file_path, state)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sızıntı dosyalarını PostgreSQL'e aktarır.")
+    parser.add_argument("paths", nargs="+", help="Dosyalar veya klasörler")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Çözümleme/temizleme için işlem sayısı")
+    parser.add_argument("--encoding", help="Algılama yerine bu kodlamayı kullan (ör. cp1254)")
+    parser.add_argument("--format", default="auto", choices=sorted(PARSERS),
+                        help="Satırları e-posta/kullanıcı adı alanlarına ayıran ayrıştırıcı")
+    parser.add_argument("--source",
+                        help="Satırların ekleneceği kaynak (döküm) adı; varsayılan dosya adıdır")
+    parser.add_argument("--chunk-bytes", type=int, default=CHUNK_BYTES,
+                        help="İşçilere gönderilen parça boyutu (bayt)")
+    parser.add_argument("--batch-mb", type=int, default=256,
+                        help="Her commit'te aktarılacak yaklaşık kaynak veri (MB)")
+    parser.add_argument("--checkpoint", default="ingest_checkpoint.json",
+                        help="Kaldığı yerden devam için kontrol noktası dosyası")
+    parser.add_argument("--bloom", default="leaks.bloom",
+                        help="Daha önce aktarılmış satırları eleyen Bloom filtresi dosyası")
+    parser.add_argument("--bloom-capacity", type=int,
+                        help="Yeni Bloom filtresinin boyutlandırıldığı satır sayısı; "
+                             f"varsayılan tablodaki satırların {BLOOM_HEADROOM} katı")
+    parser.add_argument("--bloom-error-rate", type=float, default=0.001,
+                        help="Yeni Bloom filtresinin yanlış pozitif oranı")
+    parser.add_argument("--no-bloom", action="store_true",
+                        help="Bloom filtresini kullanma; yinelenenleri yalnızca veritabanı elesin")
+    args = parser.parse_args()
+    args.batch_bytes = args.batch_mb * 1024 * 1024
+
+    require_db_config()
+    checkpoint = load_checkpoint(args.checkpoint)
+    progress = Progress()
+
+    with psycopg.connect(**db_params()) as conn, \
+            psycopg.connect(**db_params(), autocommit=True) as verify_conn:
+        bloom_path = None
+        if not args.no_bloom:
+            open_bloom(conn, args.bloom, args.bloom_capacity, args.bloom_error_rate).close()
+            bloom_path = args.bloom
+        skip = {os.path.realpath(path) for path in (args.checkpoint, args.checkpoint + '.tmp', args.bloom)}
+
+        with ProcessPoolExecutor(args.workers, initializer=init_worker, initargs=(bloom_path,)) as executor:
+            for file_path in iter_input_files(args.paths):
+                if os.path.realpath(file_path) in skip:
+                    continue
+                import_file(conn, verify_conn, executor, file_path, args, checkpoint, progress)
+
+        if bloom_path:
+            bloom = BloomFilter(bloom_path)
+            warn_bloom_capacity(bloom, stored_rows(conn))
+            bloom.close()
+
+    progress.report("Tamamlandı: ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+
+from config import (
+    SEARCH_WORKERS, SEARCH_QUEUE_SIZE, SEARCH_USER_CONCURRENCY,
+    SEARCH_USER_RATE_LIMIT, SEARCH_USER_RATE_WINDOW, SEARCH_JOB_TIMEOUT,
+)
+from metrics import JOB_SECONDS, QUEUE_DEPTH, QUEUE_WAIT_SECONDS
+
+# Searches run as jobs on a fixed number of workers instead of inside the
+# update handler, so a burst of heavy searches queues up rather than taking
+# every pool connection, and handlers return right away.
+
+
+class JobRejected(Exception):
+    """The job was not queued; the message is meant for the user."""
+
+
+class Job:
+    def __init__(self, chat_id: int, run, notify):
+        self.chat_id = chat_id
+        self.run = run  # coroutine function doing the work and replying
+        self.notify = notify  # coroutine function sending a text to the user
+        self.task = None
+        self.cancelled = False
+        self.submitted = time.monotonic()
+
+
+class SearchJobs:
+    """Bounded job queue served by ``workers`` tasks.
+
+    Each user may have ``user_concurrency`` jobs queued or running and
+    submit ``rate_limit`` jobs per ``rate_window`` seconds. Cancelling a
+    running job cancels its task; psycopg then sends the server a cancel
+    request for the query in progress.
+    """
+
+    def __init__(self, workers=SEARCH_WORKERS, queue_size=SEARCH_QUEUE_SIZE,
+                 user_concurrency=SEARCH_USER_CONCURRENCY, rate_limit=SEARCH_USER_RATE_LIMIT,
+                 rate_window=SEARCH_USER_RATE_WINDOW, job_timeout=SEARCH_JOB_TIMEOUT):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.user_concurrency = user_concurrency
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.job_timeout = job_timeout
+        self._pending = deque()  # queued jobs, oldest first
+        self._active = defaultdict(list)  # chat_id -> queued and running jobs
+        self._submitted = defaultdict(deque)  # chat_id -> recent submit times
+        self._wakeup = None
+        self._tasks = []
+        self.running = 0
+        self.completed = 0  # finished normally
+        self.failed = 0  # raised an error
+        self.cancelled = 0  # cancelled by the user, queued or running
+        self.rejected = 0
+        self.timed_out = 0
+
+    def start(self):
+        self._wakeup = asyncio.Semaphore(0)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        jobs = [job for jobs in self._active.values() for job in jobs]
+        for job in jobs:
+            self._cancel(job)
+        for task in self._tasks:
+            task.cancel()
+        running = [job.task for job in jobs if job.task is not None]
+        await asyncio.gather(*self._tasks, *running, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, chat_id: int, run, notify) -> int:
+        """Queue ``run()`` for the user and return its position in the queue."""
+        now = time.monotonic()
+        recent = self._submitted[chat_id]
+        while recent and recent[0] <= now - self.rate_window:
+            recent.popleft()
+        if len(self._active.get(chat_id, ())) >= self.user_concurrency:
+            self.rejected += 1
+            raise JobRejected(
+                f"Aynı anda en fazla {self.user_concurrency} aramanız olabilir. "
+                "Bitmesini bekleyin veya /cancel ile iptal edin."
+            )
+        if len(recent) >= self.rate_limit:
+            self.rejected += 1
+            raise JobRejected(
+                f"Çok fazla arama: {self.rate_window:.0f} saniyede en fazla {self.rate_limit}. "
+                f"{recent[0] + self.rate_window - now:.0f} saniye sonra tekrar deneyin."
+            )
+        if len(self._pending) >= self.queue_size:
+            self.rejected += 1
+            raise JobRejected("Arama kuyruğu dolu. Lütfen biraz sonra tekrar deneyin.")
+
+        job = Job(chat_id, run, notify)
+        recent.append(now)
+        self._active[chat_id].append(job)
+        self._pending.append(job)
+        self._wakeup.release()
+        return len(self._pending)
+
+    def cancel(self, chat_id: int) -> int:
+        """Cancel the user's queued and running jobs; returns how many."""
+        jobs = list(self._active.get(chat_id, ()))
+        for job in jobs:
+            self._cancel(job)
+        return len(jobs)
+
+    def _cancel(self, job: Job):
+        job.cancelled = True
+        if job.task is not None:
+            job.task.cancel()
+        else:
+            self._pending.remove(job)
+            self.cancelled += 1
+            self._finish(job)
+
+    def _finish(self, job: Job):
+        jobs = self._active.get(job.chat_id)
+        if jobs and job in jobs:
+            jobs.remove(job)
+            if not jobs:
+                del self._active[job.chat_id]
+
+    async def _worker(self):
+        while True:
+            await self._wakeup.acquire()
+            if not self._pending:
+                continue  # the job was cancelled while queued
+            job = self._pending.popleft()
+            QUEUE_WAIT_SECONDS.observe(time.monotonic() - job.submitted)
+            job.task = asyncio.create_task(job.run())
+            self.running += 1
+            started = time.monotonic()
+            try:
+                # wait() returns on completion or timeout without raising, so
+                # only stop() cancelling this worker interrupts it.
+                done, _ = await asyncio.wait({job.task}, timeout=self.job_timeout)
+                if not done:
+                    job.task.cancel()
+                    await asyncio.wait({job.task})
+                    self.timed_out += 1
+                    await self._notify(job, f"Arama {self.job_timeout:.0f} saniyeyi aştı ve iptal edildi.")
+                elif job.cancelled or job.task.cancelled():
+                    self.cancelled += 1
+                elif job.task.exception():
+                    logging.error(f"Arama işi hatası: {job.task.exception()}")
+                    self.failed += 1
+                else:
+                    self.completed += 1
+            finally:
+                JOB_SECONDS.observe(time.monotonic() - started)
+                self.running -= 1
+                self._finish(job)
+
+    async def _notify(self, job: Job, text: str):
+        try:
+            await job.notify(text)
+        except Exception as e:
+            logging.error(f"Arama bildirimi hatası: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._pending),
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+search_jobs = SearchJobs()
+QUEUE_DEPTH.set_function(lambda: len(search_jobs._pending))
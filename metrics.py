@@ -0,0 +1,94 @@
+import functools
+import logging
+from typing import Optional
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+from config import METRICS_ADDR, METRICS_PORT
+
+# Prometheus metrics for the bot's hot path, served by start_metrics_server().
+# Database timings are labelled by operation (the db.py function name, or
+# "search"/"bulk" for the per-partition and bulk queries) and by status: "ok",
+# "timeout" (statement_timeout), "cancelled" (stopped by the caller) or "error".
+
+# Latency buckets from 1 ms to 2 minutes.
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+# Result sizes from one row to the SEARCH_MAX_ROWS default.
+ROWS_BUCKETS = (0, 1, 10, 100, 1000, 10_000, 100_000, 1_000_000)
+
+POOL_ACQUIRE_SECONDS = Histogram(
+    "leakbot_db_pool_acquire_seconds", "Time waiting for a pooled connection",
+    ["operation"], buckets=SECONDS_BUCKETS,
+)
+QUERY_SECONDS = Histogram(
+    "leakbot_db_query_seconds", "Time spent executing queries and fetching their rows",
+    ["operation", "status"], buckets=SECONDS_BUCKETS,
+)
+QUERY_ROWS = Counter("leakbot_db_rows_total", "Rows returned by queries", ["operation", "status"])
+SLOW_QUERIES = Counter(
+    "leakbot_db_slow_queries_total", "Queries slower than SLOW_QUERY_SECONDS", ["operation", "status"],
+)
+
+SEARCH_RESULT_ROWS = Histogram(
+    "leakbot_search_result_rows", "Rows in a search result sent to the user",
+    ["mode"], buckets=ROWS_BUCKETS,
+)
+SENT_BYTES = Counter("leakbot_telegram_sent_bytes_total", "Bytes of result documents uploaded to Telegram")
+UPLOAD_SECONDS = Histogram(
+    "leakbot_telegram_upload_seconds", "Time uploading a result document to Telegram",
+    buckets=SECONDS_BUCKETS,
+)
+
+QUEUE_WAIT_SECONDS = Histogram(
+    "leakbot_search_queue_wait_seconds", "Time a search job waited for a worker",
+    buckets=SECONDS_BUCKETS,
+)
+JOB_SECONDS = Histogram(
+    "leakbot_search_job_seconds", "Time a search job ran, queries and upload included",
+    buckets=SECONDS_BUCKETS,
+)
+QUEUE_DEPTH = Gauge("leakbot_search_queue_depth", "Search jobs waiting for a worker")
+
+HANDLER_SECONDS = Histogram(
+    "leakbot_handler_seconds", "Time spent in a command handler",
+    ["command"], buckets=SECONDS_BUCKETS,
+)
+HANDLER_ERRORS = Counter("leakbot_handler_errors_total", "Command handlers that raised", ["command"])
+
+_server = None
+
+
+def start_metrics_server():
+    """Serve /metrics on METRICS_ADDR:METRICS_PORT; a port of 0 disables it."""
+    global _server
+    if not METRICS_PORT:
+        return
+    _server, _ = start_http_server(METRICS_PORT, addr=METRICS_ADDR)
+    logging.info(f"Metrikler http://{METRICS_ADDR}:{METRICS_PORT}/metrics adresinde.")
+
+
+def stop_metrics_server():
+    global _server
+    if _server:
+        _server.shutdown()
+        _server = None
+
+
+def instrument_handler(command: str, handler):
+    """Wrap a PTB handler so its duration and exceptions are recorded."""
+    @functools.wraps(handler)
+    async def wrapper(update, context):
+        with HANDLER_SECONDS.labels(command).time():
+            try:
+                return await handler(update, context)
+            except Exception:
+                HANDLER_ERRORS.labels(command).inc()
+                raise
+    return wrapper
+
+
+def observe_result(mode: Optional[str], rows: int, sent_bytes: int, seconds: float):
+    """Record one result document sent to a user."""
+    SEARCH_RESULT_ROWS.labels(mode or "bulk").observe(rows)
+    SENT_BYTES.inc(sent_bytes)
+    UPLOAD_SECONDS.observe(seconds)
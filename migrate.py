@@ -0,0 +1,330 @@
+import argparse
+import re
+import time
+
+import psycopg
+from psycopg import sql
+
+from config import db_params, require_db_config
+from query import normalize_keyword, like_pattern
+
+# --------------------------------------------------------------
+# Schema migrations
+# --------------------------------------------------------------
+# Each entry is (version, name, transactional, statements). Applied versions are
+# recorded in schema_migrations so the script can be re-run safely. Statements
+# such as CREATE INDEX CONCURRENTLY cannot run inside a transaction block, so
+# those migrations run in autocommit mode.
+MIGRATIONS = [
+    (1, "base_tables", True, [
+        """
+        CREATE TABLE IF NOT EXISTS leaks (
+            id SERIAL PRIMARY KEY,
+            data TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS bot_users (
+            chat_id BIGINT PRIMARY KEY,
+            is_authorized BOOLEAN NOT NULL DEFAULT FALSE,
+            is_admin BOOLEAN NOT NULL DEFAULT FALSE
+        )
+        """,
+    ]),
+    (2, "pg_trgm", True, [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    ]),
+    (3, "leaks_data_trgm_idx", False, [
+        # A previously interrupted CONCURRENTLY build leaves an INVALID index behind.
+        "DROP INDEX CONCURRENTLY IF EXISTS leaks_data_trgm_idx",
+        "CREATE INDEX CONCURRENTLY leaks_data_trgm_idx ON leaks USING gin (data gin_trgm_ops)",
+    ]),
+    (4, "leaks_parsed_columns", True, [
+        # Filled by ingest.py's record parsers; NULL for lines no parser understood.
+        """
+        ALTER TABLE leaks
+            ADD COLUMN IF NOT EXISTS email TEXT,
+            ADD COLUMN IF NOT EXISTS email_local TEXT,
+            ADD COLUMN IF NOT EXISTS email_domain TEXT,
+            ADD COLUMN IF NOT EXISTS username TEXT,
+            ADD COLUMN IF NOT EXISTS secret_type TEXT
+        """,
+    ]),
+    (5, "leaks_parsed_indexes", False, [
+        "DROP INDEX CONCURRENTLY IF EXISTS leaks_email_idx",
+        "CREATE INDEX CONCURRENTLY leaks_email_idx ON leaks (email) WHERE email IS NOT NULL",
+        "DROP INDEX CONCURRENTLY IF EXISTS leaks_email_domain_idx",
+        "CREATE INDEX CONCURRENTLY leaks_email_domain_idx ON leaks (email_domain) WHERE email_domain IS NOT NULL",
+        "DROP INDEX CONCURRENTLY IF EXISTS leaks_username_idx",
+        "CREATE INDEX CONCURRENTLY leaks_username_idx ON leaks (username) WHERE username IS NOT NULL",
+    ]),
+    (6, "leaks_line_hash", True, [
+        # md5 of the cleaned line, written by ingest.py and backfilled by dedupe.py.
+        "ALTER TABLE leaks ADD COLUMN IF NOT EXISTS line_hash BYTEA",
+    ]),
+    (7, "leaks_line_hash_key", False, [
+        # Rows imported before line_hash existed stay NULL, which the unique index allows.
+        "DROP INDEX CONCURRENTLY IF EXISTS leaks_line_hash_key",
+        "CREATE UNIQUE INDEX CONCURRENTLY leaks_line_hash_key ON leaks (line_hash)",
+    ]),
+    (8, "data_generation", True, [
+        # Single-row counter bumped in the same transaction as every change to
+        # leaks; the bot keys its result cache on it.
+        """
+        CREATE TABLE IF NOT EXISTS data_generation (
+            id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+            generation BIGINT NOT NULL DEFAULT 0
+        )
+        """,
+        "INSERT INTO data_generation (id) VALUES (TRUE) ON CONFLICT DO NOTHING",
+    ]),
+    (9, "sources", True, [
+        # One row per imported dump; ingest.py creates a leaks partition for each.
+        """
+        CREATE TABLE IF NOT EXISTS sources (
+            id SERIAL PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            partition_name TEXT NOT NULL UNIQUE,
+            format TEXT NOT NULL,
+            imported_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            row_count BIGINT NOT NULL DEFAULT 0
+        )
+        """,
+        # The existing table becomes the "legacy" source. Its row count is the
+        # planner's estimate, so no scan runs here; the source column has a
+        # constant default and its constraints are added NOT VALID, so this
+        # only takes a brief lock.
+        """
+        DO $$
+        DECLARE
+            legacy_id INTEGER;
+        BEGIN
+            INSERT INTO sources (name, partition_name, format, row_count)
+            VALUES ('legacy', 'leaks_legacy', 'auto',
+                    (SELECT greatest(reltuples, 0)::bigint FROM pg_class WHERE oid = 'leaks'::regclass))
+            RETURNING id INTO legacy_id;
+
+            EXECUTE format('ALTER TABLE leaks ADD COLUMN source_id INTEGER DEFAULT %s', legacy_id);
+            EXECUTE format('ALTER TABLE leaks ADD CONSTRAINT leaks_legacy_source_check '
+                           'CHECK (source_id IS NOT NULL AND source_id = %s) NOT VALID', legacy_id);
+            ALTER TABLE leaks ADD CONSTRAINT leaks_legacy_source_id_fkey
+                FOREIGN KEY (source_id) REFERENCES sources (id) NOT VALID;
+        END
+        $$
+        """,
+    ]),
+    (10, "leaks_legacy_validate", True, [
+        # Full scans in their own transaction. VALIDATE only takes SHARE UPDATE
+        # EXCLUSIVE, so searches and imports keep running meanwhile.
+        "ALTER TABLE leaks VALIDATE CONSTRAINT leaks_legacy_source_check",
+        "ALTER TABLE leaks VALIDATE CONSTRAINT leaks_legacy_source_id_fkey",
+    ]),
+    (11, "leaks_partitioned", True, [
+        # The table becomes the legacy partition of a new leaks table
+        # partitioned by source. Its data is not copied: the parent's indexes
+        # adopt the equivalent legacy indexes, and the validated constraints
+        # prove SET NOT NULL, the partition bound and the foreign key, so no
+        # step scans the table under this migration's exclusive lock.
+        # line_hash stays indexed per partition, since a unique index on the
+        # parent would have to include source_id and could no longer dedupe
+        # across dumps.
+        """
+        DO $$
+        DECLARE
+            legacy_id INTEGER;
+        BEGIN
+            SELECT id INTO legacy_id FROM sources WHERE name = 'legacy';
+
+            ALTER TABLE leaks RENAME TO leaks_legacy;
+            ALTER INDEX leaks_data_trgm_idx RENAME TO leaks_legacy_data_trgm_idx;
+            ALTER INDEX leaks_email_idx RENAME TO leaks_legacy_email_idx;
+            ALTER INDEX leaks_email_domain_idx RENAME TO leaks_legacy_email_domain_idx;
+            ALTER INDEX leaks_username_idx RENAME TO leaks_legacy_username_idx;
+            ALTER INDEX leaks_line_hash_key RENAME TO leaks_legacy_line_hash_key;
+            ALTER TABLE leaks_legacy ALTER COLUMN source_id SET NOT NULL;
+
+            CREATE TABLE leaks (
+                id INTEGER NOT NULL DEFAULT nextval('leaks_id_seq'),
+                data TEXT NOT NULL,
+                email TEXT,
+                email_local TEXT,
+                email_domain TEXT,
+                username TEXT,
+                secret_type TEXT,
+                line_hash BYTEA,
+                source_id INTEGER NOT NULL REFERENCES sources (id)
+            ) PARTITION BY LIST (source_id);
+            ALTER SEQUENCE leaks_id_seq OWNED BY leaks.id;
+            CREATE INDEX leaks_data_trgm_idx ON leaks USING gin (data gin_trgm_ops);
+            CREATE INDEX leaks_email_idx ON leaks (email) WHERE email IS NOT NULL;
+            CREATE INDEX leaks_email_domain_idx ON leaks (email_domain) WHERE email_domain IS NOT NULL;
+            CREATE INDEX leaks_username_idx ON leaks (username) WHERE username IS NOT NULL;
+
+            EXECUTE format('ALTER TABLE leaks ATTACH PARTITION leaks_legacy FOR VALUES IN (%s)', legacy_id);
+            ALTER TABLE leaks_legacy ALTER COLUMN source_id DROP DEFAULT;
+        END
+        $$
+        """,
+    ]),
+]
+
+# Run inside every transaction that changes the contents of leaks.
+BUMP_GENERATION_SQL = "UPDATE data_generation SET generation = generation + 1"
+
+
+def partition_name(source_id: int) -> str:
+    return f"leaks_src_{source_id}"
+
+
+def ensure_source(conn, name: str, format_name: str) -> int:
+    """Return the id of source ``name``, creating it and its partition if needed."""
+    with conn.transaction(), conn.cursor() as cur:
+        cur.execute("SELECT id FROM sources WHERE name = %s", (name,))
+        row = cur.fetchone()
+        if row:
+            return row[0]
+        cur.execute("SELECT nextval(pg_get_serial_sequence('sources', 'id'))")
+        source_id = cur.fetchone()[0]
+        partition = partition_name(source_id)
+        cur.execute(
+            "INSERT INTO sources (id, name, partition_name, format) VALUES (%s, %s, %s, %s)",
+            (source_id, name, partition, format_name),
+        )
+        cur.execute(sql.SQL("CREATE TABLE {} PARTITION OF leaks FOR VALUES IN ({})").format(
+            sql.Identifier(partition), sql.Literal(source_id)))
+        cur.execute(sql.SQL("CREATE INDEX {} ON {} (line_hash)").format(
+            sql.Identifier(f"{partition}_line_hash_idx"), sql.Identifier(partition)))
+    return source_id
+
+
+def drop_source(conn, name: str) -> bool:
+    """Drop a source's partition and metadata; False if there is no such source."""
+    with conn.transaction(), conn.cursor() as cur:
+        cur.execute("SELECT id, partition_name FROM sources WHERE name = %s", (name,))
+        row = cur.fetchone()
+        if not row:
+            return False
+        source_id, partition = row
+        cur.execute(sql.SQL("ALTER TABLE leaks DETACH PARTITION {}").format(sql.Identifier(partition)))
+        cur.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(partition)))
+        cur.execute("DELETE FROM sources WHERE id = %s", (source_id,))
+        cur.execute(BUMP_GENERATION_SQL)
+    return True
+
+
+def connect():
+    return psycopg.connect(**db_params())
+
+
+def applied_versions(conn) -> set:
+    """Create the bookkeeping table if needed and return applied versions."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+            """
+        )
+        cur.execute("SELECT version FROM schema_migrations")
+        versions = {row[0] for row in cur.fetchall()}
+    conn.commit()
+    return versions
+
+
+def apply_migration(conn, version: int, name: str, transactional: bool, statements: list):
+    conn.autocommit = not transactional
+    try:
+        with conn.cursor() as cur:
+            for statement in statements:
+                cur.execute(statement)
+            cur.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                (version, name),
+            )
+        if transactional:
+            conn.commit()
+    except Exception:
+        if transactional:
+            conn.rollback()
+        raise
+    finally:
+        conn.autocommit = False
+
+
+def migrate():
+    conn = connect()
+    try:
+        done = applied_versions(conn)
+        for version, name, transactional, statements in MIGRATIONS:
+            if version in done:
+                continue
+            print(f"Migrasyon uygulanıyor: {version:03d}_{name}")
+            started = time.perf_counter()
+            apply_migration(conn, version, name, transactional, statements)
+            print(f"  tamamlandı ({time.perf_counter() - started:.1f} sn)")
+        print("Şema güncel.")
+    finally:
+        conn.close()
+
+
+# --------------------------------------------------------------
+# Index check
+# --------------------------------------------------------------
+SEARCH_PLAN_SQL = "EXPLAIN (ANALYZE, BUFFERS) SELECT data FROM leaks WHERE data ILIKE %s ESCAPE '\\'"
+# Scan nodes that read an index, and the index they name. Since leaks is
+# partitioned the plan names each partition's index, not leaks_data_trgm_idx.
+INDEX_SCAN_RE = re.compile(r"(?:Bitmap Index Scan on|Index Scan using|Index Only Scan using) (\S+)")
+
+
+def plan_indexes(plan: str) -> set:
+    """Names of the indexes scanned in a text-format EXPLAIN plan."""
+    return set(INDEX_SCAN_RE.findall(plan))
+
+
+def search_plan(conn, keyword: str, settings=()) -> str:
+    """EXPLAIN ANALYZE the free-text search for ``keyword``; the transaction is rolled back."""
+    with conn.cursor() as cur:
+        for setting in settings:
+            cur.execute(setting)
+        cur.execute(SEARCH_PLAN_SQL, (like_pattern(normalize_keyword(keyword)),))
+        plan = "\n".join(row[0] for row in cur.fetchall())
+    conn.rollback()
+    return plan
+
+
+def explain_search(keyword: str):
+    """Compare the indexed search plan with the old sequential scan.
+
+    The rewritten query is run with the planner's defaults, then again with
+    index scans disabled to reproduce the original full-table ILIKE.
+    """
+    conn = connect()
+    try:
+        for label, settings in (
+            ("trigram index", []),
+            ("sequential scan", ["SET LOCAL enable_bitmapscan = off", "SET LOCAL enable_indexscan = off"]),
+        ):
+            started = time.perf_counter()
+            plan = search_plan(conn, keyword, settings)
+            elapsed = time.perf_counter() - started
+            uses_index = bool(plan_indexes(plan))
+            print(f"== {label}: {elapsed * 1000:.1f} ms, index kullanımı: {'evet' if uses_index else 'hayır'}")
+            print(plan)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Veritabanı şemasını günceller.")
+    parser.add_argument("--explain", metavar="KEYWORD",
+                        help="Migrasyon yerine arama sorgusunun planını ve süresini karşılaştır.")
+    args = parser.parse_args()
+
+    require_db_config()
+    if args.explain:
+        explain_search(args.explain)
+    else:
+        migrate()
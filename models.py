@@ -0,0 +1,18 @@
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+# Records returned by both storage backends (db.py and offline_index.py).
+
+
+class BotUser(NamedTuple):
+    chat_id: int
+    is_authorized: bool
+    is_admin: bool
+
+
+class Source(NamedTuple):
+    name: str
+    partition_name: Optional[str]
+    format: str
+    imported_at: Optional[datetime]
+    row_count: int
@@ -0,0 +1,586 @@
+import argparse
+import asyncio
+import bisect
+import json
+import mmap
+import os
+import shutil
+import sys
+import threading
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+from typing import List, Optional
+
+from config import OFFLINE_INDEX_DIR, SEARCH_BATCH_SIZE
+from dumps import (
+    UNSUPPORTED_ENCODINGS, clean_lines, detect_encoding, iter_chunks, iter_input_files, line_hash, source_name,
+)
+from metrics import QUERY_SECONDS, QUERY_ROWS
+from models import BotUser, Source
+from parsers import PARSERS, get_parser
+from query import SearchQuery, parse_query
+
+# Offline search backend: an on-disk trigram index over cleaned dump lines,
+# answering the same case-insensitive substring and typed queries as the
+# PostgreSQL backend without a database server.
+#
+# Layout of the index directory:
+#   manifest.json       indexed files, segments and the data generation
+#   users.json          bot_users equivalent for the offline bot
+#   seg-NNNNNN/         one shard, immutable once written:
+#     lines.dat         cleaned lines, UTF-8, newline-terminated
+#     offsets.bin       uint64 start offset of every line, plus the end offset
+#     grams.bin         sorted uint32 trigram keys
+#     gram_offsets.bin  uint64 start of every key's postings, plus the end
+#     postings.bin      uint32 line ids, ascending per key
+# Trigrams are taken over the lowercased UTF-8 bytes of a line. Segments are
+# memory-mapped and postings are read as memoryview slices without copying.
+
+MANIFEST = "manifest.json"
+USERS = "users.json"
+SEGMENT_LINES = 1_000_000
+
+
+def line_grams(data: bytes) -> set:
+    """Trigram keys of a lowercased UTF-8 byte string."""
+    return {data[i] << 16 | data[i + 1] << 8 | data[i + 2] for i in range(len(data) - 2)}
+
+
+def write_json(path, value):
+    """Atomically replace a JSON file."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(value, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_manifest(index_dir):
+    path = os.path.join(index_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {"byteorder": sys.byteorder, "generation": 0, "next_segment": 1, "segments": [], "files": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest["byteorder"] != sys.byteorder:
+        raise RuntimeError(f"{index_dir} {manifest['byteorder']} bayt sırasıyla oluşturulmuş.")
+    return manifest
+
+# --------------------------------------------------------------
+# Building
+# --------------------------------------------------------------
+def build_segment(task):
+    """Write one segment for ``lines``; runs in a worker process.
+
+    Lines repeated within the segment are stored once; repeats across
+    segments are dropped at search time.
+    """
+    seg_dir, lines = task
+    lines = list(dict.fromkeys(lines))
+    tmp_dir = seg_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    postings = {}
+    offsets = array("Q", [0])
+    with open(os.path.join(tmp_dir, "lines.dat"), "wb") as f:
+        for line_id, line in enumerate(lines):
+            raw = line.encode("utf-8") + b"\n"
+            f.write(raw)
+            offsets.append(offsets[-1] + len(raw))
+            for gram in line_grams(line.lower().encode("utf-8")):
+                ids = postings.get(gram)
+                if ids is None:
+                    postings[gram] = ids = array("I")
+                ids.append(line_id)
+
+    keys = array("I", sorted(postings))
+    gram_offsets = array("Q", [0])
+    flat = array("I")
+    for key in keys:
+        flat.extend(postings.pop(key))
+        gram_offsets.append(len(flat))
+    for name, values in (("offsets.bin", offsets), ("grams.bin", keys),
+                         ("gram_offsets.bin", gram_offsets), ("postings.bin", flat)):
+        with open(os.path.join(tmp_dir, name), "wb") as f:
+            values.tofile(f)
+
+    shutil.rmtree(seg_dir, ignore_errors=True)
+    os.rename(tmp_dir, seg_dir)
+    return len(lines)
+
+
+def iter_segment_lines(file_path, encoding, segment_lines):
+    """Yield lists of at most ``segment_lines`` cleaned lines."""
+    buffer = []
+    for _, data in iter_chunks(file_path):
+        buffer.extend(clean_lines(data, encoding))
+        while len(buffer) >= segment_lines:
+            yield buffer[:segment_lines]
+            buffer = buffer[segment_lines:]
+    if buffer:
+        yield buffer
+
+
+def build_index(index_dir, paths, format_name="auto", encoding=None, workers=1, segment_lines=SEGMENT_LINES,
+                source=None):
+    """Index files not yet in the manifest; already indexed files are skipped.
+
+    Segments are tagged with ``source``, or each file's name, so searches can
+    be limited to one dump as with the PostgreSQL partitions.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    manifest = load_manifest(index_dir)
+    skip = {os.path.realpath(os.path.join(index_dir, name)) for name in (MANIFEST, USERS)}
+    started = time.perf_counter()
+    total_lines = 0
+
+    with ProcessPoolExecutor(workers) as executor:
+        for file_path in iter_input_files(paths):
+            key = os.path.realpath(file_path)
+            if key in skip or key.startswith(os.path.realpath(index_dir) + os.sep):
+                continue
+            stat = os.stat(file_path)
+            signature = {"size": stat.st_size, "mtime": stat.st_mtime}
+            if manifest["files"].get(key, {}).get("signature") == signature:
+                print(f"Atlanıyor (zaten dizinde): {file_path}")
+                continue
+
+            file_encoding = encoding or detect_encoding(file_path)
+            if file_encoding.startswith(UNSUPPORTED_ENCODINGS):
+                print(f"Atlanıyor ({file_encoding} desteklenmiyor, dosyayı UTF-8'e çevirin): {file_path}")
+                continue
+            name_of_source = source_name(file_path, source)
+            print(f"Dizine ekleniyor: {file_path} (kaynak: {name_of_source}, kodlama: {file_encoding})")
+
+            segments = []
+            pending = []
+            for lines in iter_segment_lines(file_path, file_encoding, segment_lines):
+                name = f"seg-{manifest['next_segment']:06d}"
+                manifest["next_segment"] += 1
+                # Keep at most one segment per worker in memory.
+                if len(pending) >= workers:
+                    segments.append(finish_segment(*pending.pop(0), key, name_of_source, format_name))
+                pending.append((name, executor.submit(build_segment, (os.path.join(index_dir, name), lines))))
+            for name, future in pending:
+                segments.append(finish_segment(name, future, key, name_of_source, format_name))
+
+            # A changed file replaces the segments built from its previous version.
+            previous = set(manifest["files"].get(key, {}).get("segments", []))
+            manifest["segments"] = [seg for seg in manifest["segments"] if seg["name"] not in previous]
+            manifest["segments"].extend(segments)
+            manifest["files"][key] = {"signature": signature, "segments": [seg["name"] for seg in segments]}
+            manifest["generation"] += 1
+            write_json(os.path.join(index_dir, MANIFEST), manifest)
+            for name in previous:
+                shutil.rmtree(os.path.join(index_dir, name), ignore_errors=True)
+
+            lines = sum(seg["lines"] for seg in segments)
+            total_lines += lines
+            elapsed = max(time.perf_counter() - started, 1e-9)
+            print(f"  {lines} satır, {len(segments)} parça | toplam {total_lines / elapsed:,.0f} satır/sn")
+
+    print(f"Dizin güncel: {index_dir} ({len(manifest['segments'])} parça)")
+
+
+def finish_segment(name, future, source, source_name, format_name):
+    return {"name": name, "lines": future.result(), "source": source, "source_name": source_name,
+            "format": format_name, "built_at": time.time()}
+
+
+def drop_source(index_dir, name) -> bool:
+    """Remove every segment of source ``name``; False if there is none."""
+    manifest = load_manifest(index_dir)
+    dropped = {seg["name"] for seg in manifest["segments"] if segment_source(seg) == name}
+    if not dropped:
+        return False
+    manifest["segments"] = [seg for seg in manifest["segments"] if seg["name"] not in dropped]
+    manifest["files"] = {key: entry for key, entry in manifest["files"].items()
+                         if not dropped.intersection(entry["segments"])}
+    manifest["generation"] += 1
+    write_json(os.path.join(index_dir, MANIFEST), manifest)
+    for seg_name in dropped:
+        shutil.rmtree(os.path.join(index_dir, seg_name), ignore_errors=True)
+    return True
+
+
+def segment_source(meta) -> str:
+    # Segments built before sources existed only record the file path.
+    return meta.get("source_name") or source_name(meta["source"])
+
+# --------------------------------------------------------------
+# Searching
+# --------------------------------------------------------------
+def _map(path, fmt):
+    """Memory-map a file read-only and view it as an array of ``fmt`` items."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None, memoryview(b"").cast(fmt)
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return mm, memoryview(mm).cast(fmt)
+
+
+def _contains(sorted_ids, value) -> bool:
+    i = bisect.bisect_left(sorted_ids, value)
+    return i < len(sorted_ids) and sorted_ids[i] == value
+
+
+class Segment:
+    def __init__(self, index_dir, meta):
+        self.meta = meta
+        path = os.path.join(index_dir, meta["name"])
+        self._maps = []
+        self.lines = self._open(path, "lines.dat", "B")
+        self.offsets = self._open(path, "offsets.bin", "Q")
+        self.grams = self._open(path, "grams.bin", "I")
+        self.gram_offsets = self._open(path, "gram_offsets.bin", "Q")
+        self.postings = self._open(path, "postings.bin", "I")
+        self.parse = get_parser(meta.get("format", "auto"))
+        self.source = segment_source(meta)
+        # Searches reading this segment, and whether a reload replaced it;
+        # both are guarded by the owning OfflineIndex's lock.
+        self.users = 0
+        self.retired = False
+
+    def _open(self, path, name, fmt):
+        mm, view = _map(os.path.join(path, name), fmt)
+        self._maps.append((mm, view))
+        return view
+
+    def close(self):
+        for mm, view in self._maps:
+            try:
+                view.release()
+                if mm is not None:
+                    mm.close()
+            except BufferError:
+                # A search still holds postings slices; the map is freed with them.
+                pass
+        self._maps = []
+
+    def line(self, line_id) -> str:
+        start, end = self.offsets[line_id], self.offsets[line_id + 1] - 1
+        return str(self.lines[start:end], "utf-8")
+
+    def _posting_list(self, gram):
+        i = bisect.bisect_left(self.grams, gram)
+        if i == len(self.grams) or self.grams[i] != gram:
+            return self.postings[0:0]
+        return self.postings[self.gram_offsets[i]:self.gram_offsets[i + 1]]
+
+    def candidates(self, needle: bytes):
+        """Line ids containing every trigram of ``needle``, ascending."""
+        grams = line_grams(needle)
+        if not grams:
+            return range(len(self.offsets) - 1)
+        lists = sorted((self._posting_list(gram) for gram in grams), key=len)
+        ids = lists[0]
+        for other in lists[1:]:
+            if not ids:
+                break
+            ids = [line_id for line_id in ids if _contains(other, line_id)]
+        return ids
+
+    def search(self, query: SearchQuery):
+        """Yield lines matching ``query``; trigram candidates are verified exactly."""
+        value = query.value
+        if query.mode == "text":
+            accept = lambda line: value in line.lower()
+            needle = value
+        elif query.mode == "email":
+            accept = lambda line: self.parse(line).email == value
+            needle = value
+        elif query.mode == "domain":
+            accept = lambda line: self.parse(line).email_domain == value
+            needle = "@" + value
+        else:
+            accept = lambda line: self.parse(line).username == value
+            needle = value
+        for line_id in self.candidates(needle.encode("utf-8")):
+            line = self.line(line_id)
+            if accept(line):
+                yield line
+
+
+class OfflineIndex:
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self.segments = []
+        self._manifest_mtime = None
+        # Serializes reloads with searches taking or returning their segments.
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        """Re-open the segments if the manifest changed since the last load.
+
+        Replaced or dropped segments are closed once no search reads them.
+        """
+        with self._lock:
+            path = os.path.join(self.index_dir, MANIFEST)
+            mtime = os.path.getmtime(path) if os.path.exists(path) else None
+            if mtime == self._manifest_mtime:
+                return
+            manifest = load_manifest(self.index_dir)
+            # Segments are immutable, so already open ones are reused.
+            by_name = {seg.meta["name"]: seg for seg in self.segments}
+            self.segments = [by_name.pop(meta["name"], None) or Segment(self.index_dir, meta)
+                             for meta in manifest["segments"]]
+            self._retire(by_name.values())
+            self.generation = manifest["generation"]
+            self._manifest_mtime = mtime
+
+    def _retire(self, segments):
+        for seg in segments:
+            seg.retired = True
+            if not seg.users:
+                seg.close()
+
+    def _acquire(self):
+        with self._lock:
+            segments = list(self.segments)
+            for seg in segments:
+                seg.users += 1
+        return segments
+
+    def _release(self, segments):
+        with self._lock:
+            for seg in segments:
+                seg.users -= 1
+                if seg.retired and not seg.users:
+                    seg.close()
+
+    def search(self, query: SearchQuery):
+        """Yield matching lines from the segments open when the search starts.
+
+        They stay open until the generator is exhausted or closed, even if a
+        reload replaces them meanwhile. A line stored in several segments or
+        dumps is yielded once, by line_hash, as PostgreSQL stores it once.
+        """
+        segments = self._acquire()
+        seen = set()
+        try:
+            for segment in segments:
+                if not query.sources or segment.source in query.sources:
+                    for line in segment.search(query):
+                        digest = line_hash(line)
+                        if digest not in seen:
+                            seen.add(digest)
+                            yield line
+        finally:
+            self._release(segments)
+
+    def sources(self) -> List[Source]:
+        by_name = {}
+        for segment in self.segments:
+            meta = segment.meta
+            built_at = datetime.fromtimestamp(meta["built_at"]) if "built_at" in meta else None
+            source = by_name.get(segment.source)
+            if source is None:
+                by_name[segment.source] = Source(segment.source, None, meta.get("format", "auto"),
+                                                 built_at, meta["lines"])
+            else:
+                by_name[segment.source] = source._replace(row_count=source.row_count + meta["lines"])
+        return [by_name[name] for name in sorted(by_name)]
+
+    def close(self):
+        with self._lock:
+            self._retire(self.segments)
+            self.segments = []
+
+
+class _Scan:
+    """An OfflineIndex.search advanced from worker threads.
+
+    The lock keeps close() from running while a batch is still being read,
+    so the search releases its segments only after its last read.
+    """
+
+    def __init__(self, matches):
+        self._matches = matches
+        self._lock = threading.Lock()
+
+    def take(self, count):
+        with self._lock:
+            return list(islice(self._matches, count))
+
+    def close(self):
+        with self._lock:
+            self._matches.close()
+
+# --------------------------------------------------------------
+# Bot backend interface (same functions as db.py)
+# --------------------------------------------------------------
+index: Optional[OfflineIndex] = None
+_users = {}
+
+
+def load_users(index_dir) -> dict:
+    path = os.path.join(index_dir, USERS)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return {int(chat_id): BotUser(int(chat_id), row["is_authorized"], row["is_admin"])
+                for chat_id, row in json.load(f).items()}
+
+
+def save_users(index_dir, users: dict):
+    os.makedirs(index_dir, exist_ok=True)
+    write_json(os.path.join(index_dir, USERS), {
+        str(user.chat_id): {"is_authorized": user.is_authorized, "is_admin": user.is_admin}
+        for user in users.values()
+    })
+
+
+async def open_backend():
+    global index, _users
+    index = OfflineIndex(OFFLINE_INDEX_DIR)
+    _users = load_users(OFFLINE_INDEX_DIR)
+
+
+async def close_backend():
+    global index
+    if index:
+        index.close()
+        index = None
+
+
+async def get_user(chat_id: int) -> Optional[BotUser]:
+    return _users.get(chat_id)
+
+
+async def ensure_user_in_db(chat_id: int):
+    if chat_id not in _users:
+        _users[chat_id] = BotUser(chat_id, False, False)
+        await asyncio.to_thread(save_users, OFFLINE_INDEX_DIR, dict(_users))
+
+
+async def authorize_user(chat_id: int) -> bool:
+    user = _users.get(chat_id)
+    if user is None:
+        return False
+    _users[chat_id] = user._replace(is_authorized=True)
+    await asyncio.to_thread(save_users, OFFLINE_INDEX_DIR, dict(_users))
+    return True
+
+
+async def get_data_generation() -> int:
+    """Bumped by every build that changes the index."""
+    await asyncio.to_thread(index.reload)
+    return index.generation
+
+
+async def list_sources() -> List[Source]:
+    """Indexed dumps, by name."""
+    await asyncio.to_thread(index.reload)
+    return index.sources()
+
+
+def cache_stats():
+    """The offline backend keeps every user in memory; there is no cache."""
+    return None
+
+
+def _first(matches, count):
+    try:
+        return list(islice(matches, count))
+    finally:
+        matches.close()
+
+
+async def search_in_leaks(query: SearchQuery, batch_size: int = SEARCH_BATCH_SIZE,
+                          skipped: Optional[list] = None):
+    """Yield lines matching the query in batches of ``batch_size``.
+
+    The index is scanned in a worker thread so the event loop stays free.
+    Segments are searched to completion, so ``skipped`` is never appended to.
+    """
+    await asyncio.to_thread(index.reload)
+    scan = _Scan(index.search(query))
+    seconds, rows, status = 0.0, 0, "ok"
+    try:
+        while True:
+            started = time.perf_counter()
+            batch = await asyncio.to_thread(scan.take, batch_size)
+            seconds += time.perf_counter() - started
+            if not batch:
+                break
+            rows += len(batch)
+            yield batch
+    except (asyncio.CancelledError, GeneratorExit):
+        status = "cancelled"
+        raise
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        QUERY_SECONDS.labels("search", status).observe(seconds)
+        QUERY_ROWS.labels("search", status).inc(rows)
+        # Not awaited: after a cancellation a batch may still be read in its
+        # thread, and close() waits for it there.
+        asyncio.get_running_loop().run_in_executor(None, scan.close)
+
+
+async def bulk_search(mode: str, keywords: List[str], limit: int, timeout: float):
+    """Same contract as db.bulk_search; keywords are looked up one by one."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    await asyncio.to_thread(index.reload)
+    for keyword in keywords:
+        if loop.time() >= deadline:
+            raise asyncio.TimeoutError
+        rows = await asyncio.to_thread(_first, index.search(SearchQuery(mode, keyword)), limit + 1)
+        if rows:
+            yield keyword, rows[:limit], len(rows) > limit
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Çevrimdışı arama dizinini yönetir.")
+    parser.add_argument("--index-dir", default=OFFLINE_INDEX_DIR, help="Dizin klasörü")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Yeni dosyaları dizine ekle")
+    build.add_argument("paths", nargs="+", help="Dosyalar veya klasörler")
+    build.add_argument("--format", default="auto", choices=sorted(PARSERS),
+                       help="email:/domain:/username: aramalarında kullanılacak ayrıştırıcı")
+    build.add_argument("--encoding", help="Algılama yerine bu kodlamayı kullan (ör. cp1254)")
+    build.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    build.add_argument("--segment-lines", type=int, default=SEGMENT_LINES,
+                       help="Parça başına satır sayısı")
+    build.add_argument("--source", help="Kaynak (döküm) adı; varsayılan dosya adıdır")
+
+    search = commands.add_parser("search", help="Dizinde arama yap")
+    search.add_argument("keyword")
+
+    drop = commands.add_parser("drop-source", help="Bir kaynağın tüm parçalarını dizinden sil")
+    drop.add_argument("name")
+
+    admin = commands.add_parser("admin", help="Bir chat_id'yi süper admin yap")
+    admin.add_argument("chat_id", type=int)
+
+    args = parser.parse_args()
+    if args.command == "build":
+        build_index(args.index_dir, args.paths, args.format, args.encoding, args.workers, args.segment_lines,
+                    args.source)
+    elif args.command == "search":
+        offline = OfflineIndex(args.index_dir)
+        started = time.perf_counter()
+        count = 0
+        for line in offline.search(parse_query(args.keyword)):
+            print(line)
+            count += 1
+        print(f"{count} sonuç, {(time.perf_counter() - started) * 1000:.1f} ms", file=sys.stderr)
+    elif args.command == "drop-source":
+        name = args.name.strip().lower()
+        if drop_source(args.index_dir, name):
+            print(f"'{name}' kaynağı dizinden silindi.")
+        else:
+            print(f"'{name}' adında bir kaynak yok.")
+    else:
+        users = load_users(args.index_dir)
+        users[args.chat_id] = BotUser(args.chat_id, True, True)
+        save_users(args.index_dir, users)
+        print(f"{args.chat_id} süper admin yapıldı.")
@@ -0,0 +1,146 @@
+import re
+from typing import NamedTuple, Optional
+
+# Record parsers turn one cleaned leak line into normalized lookup fields.
+# They are registered by name with @parser and chosen per dump with
+# `ingest.py --format NAME`; "auto" handles the common combo-list layouts.
+
+EMAIL_RE = re.compile(r"^[^@\s:;|,]+@[^@\s:;|,]+\.[^@\s:;|,]+$")
+SEPARATORS = (":", ";", "|", "\t", ",")
+URL_PREFIX_RE = re.compile(r"^[a-z][a-z0-9+.-]*://", re.IGNORECASE)
+
+SECRET_PATTERNS = (
+    ("bcrypt", re.compile(r"^\$2[abxy]?\$\d\d\$[./A-Za-z0-9]{53}$")),
+    ("md5", re.compile(r"^[0-9a-fA-F]{32}$")),
+    ("sha1", re.compile(r"^[0-9a-fA-F]{40}$")),
+    ("sha256", re.compile(r"^[0-9a-fA-F]{64}$")),
+    ("sha512", re.compile(r"^[0-9a-fA-F]{128}$")),
+)
+
+
+class ParsedLine(NamedTuple):
+    email: Optional[str] = None
+    email_local: Optional[str] = None
+    email_domain: Optional[str] = None
+    username: Optional[str] = None
+    secret_type: Optional[str] = None
+
+
+EMPTY = ParsedLine()
+PARSERS = {}
+
+
+def parser(name: str):
+    """Register a record parser under ``name``."""
+    def register(func):
+        PARSERS[name] = func
+        return func
+    return register
+
+
+def get_parser(name: str):
+    try:
+        return PARSERS[name]
+    except KeyError:
+        raise ValueError(f"Bilinmeyen format: {name} (seçenekler: {', '.join(sorted(PARSERS))})")
+
+
+def classify_secret(secret: str) -> Optional[str]:
+    if not secret:
+        return None
+    for name, pattern in SECRET_PATTERNS:
+        if pattern.match(secret):
+            return name
+    return "plaintext"
+
+
+def build(email: Optional[str], username: Optional[str], secret: Optional[str]) -> ParsedLine:
+    """Normalize raw field values into a ParsedLine."""
+    local = domain = None
+    if email:
+        email = email.lower()
+        local, _, domain = email.partition("@")
+    username = username.lower() if username else None
+    return ParsedLine(email, local, domain, username, classify_secret(secret))
+
+
+def is_email(value: str) -> bool:
+    return bool(EMAIL_RE.match(value))
+
+
+def split_fields(line: str, separator: str, maxsplit: int = -1):
+    return [field.strip() for field in line.split(separator, maxsplit)]
+
+
+@parser("plain")
+def parse_plain(line: str) -> ParsedLine:
+    """Leave the line unparsed; it is only reachable through free-text search."""
+    return EMPTY
+
+
+@parser("combo")
+def parse_combo(line: str) -> ParsedLine:
+    """``email:password`` or ``username:password``; the password may contain ':'."""
+    fields = split_fields(line, ":", maxsplit=1)
+    if len(fields) != 2 or not fields[0]:
+        return EMPTY
+    login, secret = fields
+    if is_email(login):
+        return build(login, None, secret)
+    return build(None, login, secret)
+
+
+@parser("user_email_hash")
+def parse_user_email_hash(line: str) -> ParsedLine:
+    """``username;email;hash`` exports."""
+    fields = split_fields(line, ";")
+    if len(fields) < 3 or not is_email(fields[1]):
+        return EMPTY
+    return build(fields[1], fields[0] or None, fields[-1])
+
+
+def delimited_layout(line: str):
+    """Fields of a line separated by ";", "|", tab or ",", or None.
+
+    A separator is taken when one of its fields is an email and the first
+    field has no ':', so ``user;email;salt:hash`` is not read as a combo
+    whose password holds the rest of the line.
+    """
+    for separator in SEPARATORS[1:]:
+        if separator not in line:
+            continue
+        fields = split_fields(line, separator)
+        if ":" not in fields[0] and any(is_email(field) for field in fields):
+            return fields
+    return None
+
+
+def parse_fields(fields) -> ParsedLine:
+    email = next((field for field in fields if is_email(field)), None)
+    others = [field for field in fields[:-1] if field and field != email]
+    username = others[0] if others else None
+    if email is None and username is None:
+        return EMPTY
+    return build(email, username, fields[-1])
+
+
+@parser("auto")
+def parse_auto(line: str) -> ParsedLine:
+    """Delimited lines with an email field are split on their separator;
+    other colon-separated lines are combos. For delimited lines the first
+    non-email field is the username and the last field the secret."""
+    if URL_PREFIX_RE.match(line):
+        # Stealer-log "url:login:password" lines; the URL itself contains ':'.
+        fields = split_fields(line, ":")
+        if len(fields) < 4:
+            return EMPTY
+        return parse_combo(":".join(fields[-2:]))
+    fields = delimited_layout(line)
+    if fields is not None:
+        return parse_fields(fields)
+    separator = next((sep for sep in SEPARATORS if sep in line), None)
+    if separator is None:
+        return build(line, None, None) if is_email(line) else EMPTY
+    if separator == ":":
+        return parse_combo(line)
+    return parse_fields(split_fields(line, separator))
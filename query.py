@@ -0,0 +1,52 @@
+from typing import NamedTuple, Tuple
+
+# Typed prefixes served by exact-match indexes on the parsed columns.
+SEARCH_MODES = ("email", "domain", "username")
+# Restricts a search to the named dumps; may be given more than once.
+SOURCE_PREFIX = "source:"
+
+
+class SearchQuery(NamedTuple):
+    mode: str  # "text" or one of SEARCH_MODES
+    value: str
+    sources: Tuple[str, ...] = ()  # empty means every source
+
+    @property
+    def label(self) -> str:
+        label = self.value if self.mode == "text" else f"{self.mode}_{self.value}"
+        return "_".join((label,) + self.sources)
+
+
+def normalize_keyword(keyword: str) -> str:
+    """Case-fold the keyword and trim its ends; inner whitespace is kept so a
+    substring search still means what was typed."""
+    return keyword.strip().lower()
+
+
+def escape_like(value: str) -> str:
+    """Escape LIKE wildcards so user input only matches literally."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def like_pattern(keyword: str) -> str:
+    """Substring pattern for ``ILIKE ... ESCAPE '\\'`` on a normalized keyword."""
+    return f"%{escape_like(keyword)}%"
+
+
+def parse_query(text: str) -> SearchQuery:
+    """Split ``email:x@y.com``-style input into a typed query.
+
+    ``source:NAME`` words limit the search to those dumps. Anything without
+    a known prefix is a case-insensitive substring search.
+    """
+    words = normalize_keyword(text).split(" ")
+    sources = tuple(sorted({word[len(SOURCE_PREFIX):] for word in words
+                            if word.startswith(SOURCE_PREFIX) and len(word) > len(SOURCE_PREFIX)}))
+    keyword = " ".join(word for word in words if not word.startswith(SOURCE_PREFIX)).strip()
+    mode, sep, value = keyword.partition(":")
+    if sep and mode in SEARCH_MODES and value.strip():
+        value = value.strip()
+        if mode == "domain":
+            value = value.lstrip("@")
+        return SearchQuery(mode, value, sources)
+    return SearchQuery("text", keyword, sources)
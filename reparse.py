@@ -0,0 +1,97 @@
+import argparse
+import time
+
+import psycopg
+
+from config import db_params, require_db_config
+from migrate import BUMP_GENERATION_SQL
+from parsers import EMPTY, PARSERS, ParsedLine, get_parser
+
+# Fills the parsed columns (migrations 4/5) for rows imported before the
+# record parsers existed; ingest.py parses new lines itself. Rows whose
+# parsed columns are all NULL are parsed again, one committed id range of
+# one source at a time, so the script can be stopped and re-run. Lines no
+# parser understands stay NULL and are simply parsed again on a re-run.
+SOURCE_SQL = "SELECT id, format FROM sources WHERE name = %s"
+RANGE_SQL = "SELECT min(id), max(id) FROM leaks WHERE source_id = %s"
+UNPARSED_SQL = """
+    SELECT id, data FROM leaks
+    WHERE source_id = %(source_id)s AND id >= %(start)s AND id < %(end)s
+      AND email IS NULL AND username IS NULL AND secret_type IS NULL
+"""
+COLUMNS = ", ".join(("id",) + ParsedLine._fields)
+STAGING_SQL = f"""
+    CREATE TEMP TABLE IF NOT EXISTS reparse_staging
+    ON COMMIT DELETE ROWS AS SELECT {COLUMNS} FROM leaks WITH NO DATA
+"""
+COPY_SQL = f"COPY reparse_staging ({COLUMNS}) FROM STDIN"
+UPDATE_SQL = f"""
+    UPDATE leaks l SET {", ".join(f"{name} = s.{name}" for name in ParsedLine._fields)}
+    FROM reparse_staging s
+    WHERE l.source_id = %s AND l.id = s.id
+"""
+
+
+def reparse_source(conn, name, format_name, batch_rows):
+    """Parse the unparsed rows of source ``name``; returns the number filled."""
+    with conn.cursor() as cur:
+        cur.execute(SOURCE_SQL, (name,))
+        row = cur.fetchone()
+        if row is not None:
+            cur.execute(RANGE_SQL, (row[0],))
+            first, last = cur.fetchone()
+    conn.commit()
+    if row is None:
+        print(f"Kaynak bulunamadı: {name}")
+        return 0
+    source_id, stored_format = row
+    if first is None:
+        print(f"Kaynak boş: {name}")
+        return 0
+    parse = get_parser(format_name or stored_format)
+    print(f"Ayrıştırılıyor: {name} (format: {format_name or stored_format}, id {first}-{last})")
+
+    started = time.perf_counter()
+    seen_total = filled_total = 0
+    for start in range(first, last + 1, batch_rows):
+        with conn.transaction(), conn.cursor() as cur:
+            cur.execute(UNPARSED_SQL, {"source_id": source_id, "start": start, "end": start + batch_rows})
+            rows = cur.fetchall()
+            parsed = []
+            for row_id, data in rows:
+                fields = parse(data)
+                if fields != EMPTY:
+                    parsed.append((row_id,) + fields)
+            if parsed:
+                cur.execute(STAGING_SQL)
+                with cur.copy(COPY_SQL) as copy:
+                    for record in parsed:
+                        copy.write_row(record)
+                cur.execute(UPDATE_SQL, (source_id,))
+                cur.execute(BUMP_GENERATION_SQL)
+        seen_total += len(rows)
+        filled_total += len(parsed)
+        done = min(start + batch_rows, last + 1) - first
+        print(
+            f"  id {start}-{start + batch_rows - 1}: {len(rows)} satır, {len(parsed)} ayrıştırıldı | "
+            f"%{done * 100 // (last - first + 1)}, {time.perf_counter() - started:.0f} sn"
+        )
+    print(f"Tamamlandı: {seen_total} satırdan {filled_total} tanesi ayrıştırıldı.")
+    return filled_total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Ayrıştırıcılardan önce aktarılmış satırların e-posta/kullanıcı adı sütunlarını doldurur."
+    )
+    parser.add_argument("--source", default="legacy",
+                        help="İşlenecek kaynak; varsayılan, migrasyon 9'dan önceki satırları tutan legacy")
+    parser.add_argument("--format", choices=sorted(PARSERS),
+                        help="Kaynağın kayıtlı formatı yerine bu ayrıştırıcıyı kullan")
+    parser.add_argument("--batch-rows", type=int, default=1_000_000,
+                        help="Tek işlemde taranan id aralığı")
+    args = parser.parse_args()
+
+    require_db_config()
+    with psycopg.connect(**db_params()) as conn:
+        reparse_source(conn, args.source.strip().lower(), args.format, args.batch_rows)
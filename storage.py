@@ -0,0 +1,18 @@
+from config import SEARCH_BACKEND
+
+# The bot talks to whichever backend SEARCH_BACKEND selects through this
+# module; both expose the same coroutine functions.
+if SEARCH_BACKEND == "postgres":
+    from db import (
+        open_pool as open_backend, close_pool as close_backend, cache_stats,
+        get_user, ensure_user_in_db, authorize_user, search_in_leaks, get_data_generation, list_sources,
+        bulk_search,
+    )
+elif SEARCH_BACKEND == "offline":
+    from offline_index import (
+        open_backend, close_backend, cache_stats,
+        get_user, ensure_user_in_db, authorize_user, search_in_leaks, get_data_generation, list_sources,
+        bulk_search,
+    )
+else:
+    raise EnvironmentError(f"Bilinmeyen SEARCH_BACKEND: {SEARCH_BACKEND} (postgres veya offline olmalı).")
@@ -0,0 +1,17 @@
+import pytest
+
+from bulk import parse_bulk_keyword
+from query import SearchQuery
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("john.doe", SearchQuery("text", "john.doe")),
+    ("ahmet.yilmaz", SearchQuery("text", "ahmet.yilmaz")),
+    ("example.com", SearchQuery("domain", "example.com")),
+    ("Site.COM.tr", SearchQuery("domain", "site.com.tr")),
+    ("@corp.local", SearchQuery("domain", "corp.local")),
+    ("domain:john.doe", SearchQuery("domain", "john.doe")),
+    ("A@B.com", SearchQuery("email", "a@b.com")),
+])
+def test_parse_bulk_keyword(line, expected):
+    assert parse_bulk_keyword(line) == expected
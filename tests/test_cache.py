@@ -0,0 +1,30 @@
+from cache import MISSING, ByteLRUCache
+
+
+def test_byte_cache_evicts_least_recently_used_by_size():
+    cache = ByteLRUCache(10)
+    cache.set("a", "A", 4)
+    cache.set("b", "B", 4)
+    cache.get("a")
+    cache.set("c", "C", 4)
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.bytes == 8
+
+
+def test_byte_cache_replaces_entries_and_skips_oversized_values():
+    cache = ByteLRUCache(10)
+    cache.set("a", "A", 6)
+    cache.set("a", "A2", 3)
+    assert cache.bytes == 3 and cache.get("a") == "A2"
+    cache.set("big", "X", 11)
+    assert cache.get("big") is MISSING
+    assert cache.bytes == 3
+
+
+def test_byte_cache_invalidate_releases_bytes():
+    cache = ByteLRUCache(10)
+    cache.set("a", "A", 5)
+    cache.invalidate("a")
+    cache.invalidate("missing")
+    assert cache.bytes == 0 and len(cache) == 0
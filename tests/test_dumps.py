@@ -0,0 +1,19 @@
+import pytest
+
+from dumps import clean_lines
+
+
+def test_clean_lines_strips_and_skips_empty_lines():
+    data = b"  a@b.com:pass \r\n\r\n\x00user:pw\n   \nlast"
+    assert list(clean_lines(data, "utf-8")) == ["a@b.com:pass", "user:pw", "last"]
+
+
+@pytest.mark.parametrize("separator", ["\x0b", "\x0c", "\x1c", "\x1d", "\x1e", "\x85", " ", " "])
+def test_clean_lines_splits_on_newline_only(separator):
+    data = f"a@b.com:p{separator}w\nnext\n".encode("utf-8")
+    assert list(clean_lines(data, "utf-8")) == [f"a@b.com:p{separator}w", "next"]
+
+
+def test_clean_lines_keeps_nel_in_single_byte_encodings():
+    # 0x85 decodes to NEL in ISO-8859-9 and must not end the line.
+    assert list(clean_lines(b"a@b.com:p\x85w\n", "iso-8859-9")) == ["a@b.com:p\x85w"]
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+import export
+from cache import ByteLRUCache
+from query import SearchQuery
+
+QUERY = SearchQuery("text", "example")
+
+
+class FakeSearch:
+    """search_in_leaks stand-in that blocks until released."""
+
+    def __init__(self):
+        self.calls = 0
+        self.cancelled = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self, query, skipped=None):
+        self.calls += 1
+        try:
+            await self.release.wait()
+            yield [f"{query.value}@x.com:pw"]
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(export, "result_cache", ByteLRUCache(10 * 1024 * 1024))
+    monkeypatch.setattr(export, "_in_flight", {})
+    monkeypatch.setattr(export, "coalesced", 0)
+
+
+def test_identical_concurrent_searches_run_one_query():
+    async def main():
+        search = FakeSearch()
+        waiters = [asyncio.create_task(export.search_results(QUERY, search, 1)) for _ in range(5)]
+        await asyncio.sleep(0)
+        search.release.set()
+        results = await asyncio.gather(*waiters)
+        return search, results
+
+    search, results = asyncio.run(main())
+    assert search.calls == 1
+    assert all(result == results[0] for result in results)
+    assert results[0].rows == 1
+    assert export.coalesced == 4
+
+
+def test_cancelling_one_waiter_keeps_the_search_running():
+    async def main():
+        search = FakeSearch()
+        first = asyncio.create_task(export.search_results(QUERY, search, 1))
+        second = asyncio.create_task(export.search_results(QUERY, search, 1))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.sleep(0.01)
+        search.release.set()
+        result = await second
+        return search, first, result
+
+    search, first, result = asyncio.run(main())
+    assert first.cancelled()
+    assert result.rows == 1
+    assert search.calls == 1 and search.cancelled == 0
+
+
+def test_cancelling_the_last_waiter_cancels_the_search():
+    async def main():
+        search = FakeSearch()
+        waiter = asyncio.create_task(export.search_results(QUERY, search, 1))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        await asyncio.sleep(0.01)
+        return search
+
+    search = asyncio.run(main())
+    assert search.cancelled == 1
+    assert export._in_flight == {}
+
+
+def test_generation_keys_the_cache():
+    async def main():
+        search = FakeSearch()
+        search.release.set()
+        await export.search_results(QUERY, search, 1)
+        await export.search_results(QUERY, search, 1)
+        calls_same_generation = search.calls
+        await export.search_results(QUERY, search, 2)
+        return calls_same_generation, search.calls
+
+    assert asyncio.run(main()) == (1, 2)
@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+
+from jobs import JobRejected, SearchJobs
+
+
+class Recorder:
+    """Job bodies that block until released, and a notify that records texts."""
+
+    def __init__(self):
+        self.started = []
+        self.finished = []
+        self.notified = []
+        self.release = asyncio.Event()
+
+    def job(self, name):
+        async def run():
+            self.started.append(name)
+            await self.release.wait()
+            self.finished.append(name)
+        return run
+
+    async def notify(self, text):
+        self.notified.append(text)
+
+
+def run_jobs(scenario, **options):
+    """Run ``scenario(jobs, recorder)`` against a started SearchJobs."""
+    async def main():
+        jobs = SearchJobs(**dict(dict(workers=1, queue_size=10, user_concurrency=1, rate_limit=100,
+                                      rate_window=60, job_timeout=10), **options))
+        jobs.start()
+        recorder = Recorder()
+        try:
+            await scenario(jobs, recorder)
+        finally:
+            recorder.release.set()
+            await jobs.stop()
+        return jobs, recorder
+    return asyncio.run(main())
+
+
+def test_per_user_concurrency_limit():
+    async def scenario(jobs, recorder):
+        jobs.submit(1, recorder.job("a"), recorder.notify)
+        with pytest.raises(JobRejected):
+            jobs.submit(1, recorder.job("b"), recorder.notify)
+        jobs.submit(2, recorder.job("c"), recorder.notify)
+
+    jobs, _ = run_jobs(scenario)
+    assert jobs.rejected == 1
+
+
+def test_per_user_rate_limit():
+    async def scenario(jobs, recorder):
+        recorder.release.set()
+        for name in ("a", "b"):
+            jobs.submit(1, recorder.job(name), recorder.notify)
+            await asyncio.sleep(0.01)
+        with pytest.raises(JobRejected, match="Çok fazla arama"):
+            jobs.submit(1, recorder.job("c"), recorder.notify)
+
+    jobs, recorder = run_jobs(scenario, rate_limit=2)
+    assert recorder.finished == ["a", "b"]
+    assert jobs.completed == 2 and jobs.rejected == 1
+
+
+def test_full_queue_rejects():
+    async def scenario(jobs, recorder):
+        jobs.submit(1, recorder.job("running"), recorder.notify)
+        await asyncio.sleep(0)
+        assert jobs.submit(2, recorder.job("queued"), recorder.notify) == 1
+        with pytest.raises(JobRejected, match="dolu"):
+            jobs.submit(3, recorder.job("refused"), recorder.notify)
+
+    jobs, recorder = run_jobs(scenario, queue_size=1)
+    assert "refused" not in recorder.started
+
+
+def test_cancel_queued_job_and_spare_permit():
+    async def scenario(jobs, recorder):
+        jobs.submit(1, recorder.job("a"), recorder.notify)
+        await asyncio.sleep(0)
+        jobs.submit(2, recorder.job("b"), recorder.notify)
+        assert jobs.cancel(2) == 1
+        # b's wakeup permit is still there; the worker must skip it and run c.
+        jobs.submit(3, recorder.job("c"), recorder.notify)
+        recorder.release.set()
+        await asyncio.sleep(0.05)
+        assert jobs.stats()["queued"] == 0 and jobs.running == 0
+
+    jobs, recorder = run_jobs(scenario)
+    assert recorder.started == ["a", "c"]
+    assert jobs.cancelled == 1 and jobs.completed == 2
+
+
+def test_cancel_running_job():
+    async def scenario(jobs, recorder):
+        jobs.submit(1, recorder.job("a"), recorder.notify)
+        await asyncio.sleep(0.01)
+        assert jobs.cancel(1) == 1
+        await asyncio.sleep(0.01)
+        # The user's slot is free again.
+        jobs.submit(1, recorder.job("b"), recorder.notify)
+        recorder.release.set()
+        await asyncio.sleep(0.01)
+
+    jobs, recorder = run_jobs(scenario)
+    assert recorder.finished == ["b"]
+    assert jobs.cancelled == 1 and jobs.completed == 1
+
+
+def test_timeout_cancels_and_notifies():
+    async def scenario(jobs, recorder):
+        jobs.submit(1, recorder.job("slow"), recorder.notify)
+        await asyncio.sleep(0.1)
+
+    jobs, recorder = run_jobs(scenario, job_timeout=0.02)
+    assert recorder.finished == []
+    assert jobs.timed_out == 1 and jobs.completed == 0
+    assert "saniyeyi aştı" in recorder.notified[0]
+
+
+def test_failed_job_is_counted_separately():
+    async def scenario(jobs, recorder):
+        async def broken():
+            raise RuntimeError("boom")
+        jobs.submit(1, broken, recorder.notify)
+        await asyncio.sleep(0.01)
+
+    jobs, _ = run_jobs(scenario)
+    assert jobs.failed == 1 and jobs.completed == 0
@@ -0,0 +1,32 @@
+import pytest
+
+from parsers import EMPTY, ParsedLine, parse_auto, parse_combo
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("a@b.com:pass", ParsedLine("a@b.com", "a", "b.com", None, "plaintext")),
+    ("John:pa:ss", ParsedLine(None, None, None, "john", "plaintext")),
+    ("a@b.com:pa;ss", ParsedLine("a@b.com", "a", "b.com", None, "plaintext")),
+    ("a@b.com:x;c@d.com", ParsedLine("a@b.com", "a", "b.com", None, "plaintext")),
+    ("user|mail@x.com|5f4dcc3b5aa765d61d8327deb882cf99",
+     ParsedLine("mail@x.com", "mail", "x.com", "user", "md5")),
+    ("https://site.com/login:a@b.com:pw", ParsedLine("a@b.com", "a", "b.com", None, "plaintext")),
+    ("a@b.com", ParsedLine("a@b.com", "a", "b.com", None, None)),
+    ("no separators here", EMPTY),
+])
+def test_parse_auto(line, expected):
+    assert parse_auto(line) == expected
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("john;john@x.com;salt:hash", ParsedLine("john@x.com", "john", "x.com", "john", "plaintext")),
+    ("a@b.com,pass:word", ParsedLine("a@b.com", "a", "b.com", None, "plaintext")),
+    ("john|John@X.com|a:b:c", ParsedLine("john@x.com", "john", "x.com", "john", "plaintext")),
+    ("john\tjohn@x.com\tsalt:hash", ParsedLine("john@x.com", "john", "x.com", "john", "plaintext")),
+])
+def test_parse_auto_mixed_separators(line, expected):
+    assert parse_auto(line) == expected
+
+
+def test_parse_combo_keeps_colons_in_password():
+    assert parse_combo("a@b.com:p:w").email == "a@b.com"
@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+# Runs against the database configured by DB_* (use a scratch one, it is
+# migrated); skipped when no database is configured.
+pytestmark = pytest.mark.skipif(
+    not all(os.getenv(name) for name in ("DB_NAME", "DB_USER", "DB_PASSWORD", "DB_HOST", "DB_PORT")),
+    reason="DB_* ayarlı değil",
+)
+
+GIN_INDEXES_SQL = """
+    SELECT c.relname FROM pg_class c JOIN pg_am a ON a.oid = c.relam
+    WHERE c.relkind = 'i' AND a.amname = 'gin'
+"""
+
+
+@pytest.fixture
+def conn():
+    import migrate
+
+    migrate.migrate()
+    conn = migrate.connect()
+    yield conn
+    conn.close()
+
+
+def test_free_text_search_uses_trigram_index(conn):
+    from migrate import plan_indexes, search_plan
+
+    # An empty or small table would be sequentially scanned on cost alone;
+    # disabling that checks the query shape can use the index at all.
+    plan = search_plan(conn, "example", ["SET LOCAL enable_seqscan = off"])
+    with conn.cursor() as cur:
+        cur.execute(GIN_INDEXES_SQL)
+        gin_indexes = {row[0] for row in cur.fetchall()}
+    conn.rollback()
+    assert plan_indexes(plan) & gin_indexes, plan